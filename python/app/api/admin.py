@@ -0,0 +1,70 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.api.schemas import ErrorResponse, ProfileResponse
+from app.api.serialization import ORJSONRoute
+from app.config import settings
+from app.core import preprocessor, prompt_builder, response_parser
+from app.utils.profiler import ProfilerBusy, profiler
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+# Modules whose allocations are reported in memory mode
+TRACKED_FILES = [preprocessor.__file__, prompt_builder.__file__, response_parser.__file__]
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints do not exist unless ADMIN_TOKEN is configured."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+admin_router = APIRouter(
+    prefix="/admin",
+    dependencies=[Depends(require_admin)],
+    route_class=ORJSONRoute,
+    responses={
+        403: {"model": ErrorResponse, "description": "Invalid admin token"},
+        409: {"model": ErrorResponse, "description": "A profiling session is already running"}
+    }
+)
+
+def _render(result: dict, format: str):
+    if format == "folded":
+        return PlainTextResponse(result["folded"])
+    return result
+
+@admin_router.post("/profile/sample", response_model=ProfileResponse)
+async def profile_sample(
+    seconds: float = Query(10.0, gt=0, le=60, description="How long to sample"),
+    interval_ms: float = Query(10.0, ge=5, le=1000, description="Sampling interval"),
+    memory: bool = Query(False, description="Also trace allocations with tracemalloc (slower)"),
+    top_n: int = Query(10, ge=1, le=100),
+    format: Literal["json", "folded"] = Query("json", description="'folded' returns only the collapsed stacks as text")
+):
+    """Samples every thread's stack for a fixed duration."""
+    logger.info(f"Admin: profiling for {seconds}s (interval={interval_ms}ms, memory={memory})")
+    try:
+        result = await profiler.profile_for(seconds, interval_ms, memory, TRACKED_FILES, top_n)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    return _render(result, format)
+
+@admin_router.post("/profile/requests", response_model=ProfileResponse)
+async def profile_requests(
+    count: int = Query(10, ge=1, le=100, description="Number of /analyze requests to profile"),
+    timeout_seconds: float = Query(60.0, gt=0, le=300, description="Give up waiting for requests after this long"),
+    interval_ms: float = Query(10.0, ge=5, le=1000, description="Sampling interval"),
+    memory: bool = Query(False, description="Also trace allocations with tracemalloc (slower)"),
+    top_n: int = Query(10, ge=1, le=100),
+    format: Literal["json", "folded"] = Query("json", description="'folded' returns only the collapsed stacks as text")
+):
+    """Samples while the next `count` /analyze requests are in flight."""
+    logger.info(f"Admin: profiling the next {count} analyze requests (memory={memory})")
+    try:
+        result = await profiler.profile_requests(count, timeout_seconds, interval_ms, memory, TRACKED_FILES, top_n)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    return _render(result, format)
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
-from app.api.schemas import FeedbackRequest, AnalysisResponse, ErrorResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from app.api.schemas import FeedbackRequest, AnalysisResponse, ErrorResponse, TrendsResponse
+from app.api.serialization import ORJSONRoute, dump_analysis, json_bytes_response
+from app.config import settings
 from app.core.pipeline import analyze_feedback
 from app.core.inference import Phi4MiniEngine
+from app.core.cancellation import CancellationToken, GenerationCancelled
+from app.core import trends
+from app.utils.metrics import metrics
+from app.utils.profiler import profiler
+import asyncio
 import logging
+import os
+import sqlite3
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 logger = logging.getLogger(__name__)
 
 def get_engine(request: Request) -> Phi4MiniEngine:
@@ -12,6 +21,18 @@ def get_engine(request: Request) -> Phi4MiniEngine:
         raise HTTPException(status_code=503, detail="AI Model not loaded")
     return request.app.state.engine
 
+async def watch_disconnect(http_request: Request, cancel_token: CancellationToken):
+    """
+    Polls the ASGI connection and cancels the token once the client goes away,
+    so an abandoned generation stops at its next token.
+    """
+    while not cancel_token.cancelled:
+        if await http_request.is_disconnected():
+            logger.info("Client disconnected, cancelling generation")
+            cancel_token.cancel()
+            return
+        await asyncio.sleep(settings.disconnect_poll_interval_seconds)
+
 @router.post(
     "/analyze", 
     response_model=AnalysisResponse,
@@ -23,17 +44,62 @@ def get_engine(request: Request) -> Phi4MiniEngine:
 )
 async def analyze_endpoint(
     request: FeedbackRequest, 
+    http_request: Request,
     engine: Phi4MiniEngine = Depends(get_engine)
 ):
+    profiled = profiler.on_request_start()
+    cancel_token = CancellationToken()
+    watcher = asyncio.create_task(watch_disconnect(http_request, cancel_token))
     try:
-        response = await analyze_feedback(request, engine)
-        return response
+        result = await analyze_feedback(request, engine, cancel_token)
+        # Return bytes directly: the model was validated when it was built,
+        # and cache hits are already serialized.
+        body = result if isinstance(result, bytes) else dump_analysis(result)
+        return json_bytes_response(body)
+    except GenerationCancelled:
+        # Nobody is listening any more; 499 mirrors nginx's "client closed request".
+        raise HTTPException(status_code=499, detail="Client closed request")
     except ValueError as e:
         logger.error(f"Analysis failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate valid analysis. Please try again.")
     except Exception as e:
         logger.exception("Unexpected error during analysis")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        watcher.cancel()
+        profiler.on_request_end(profiled)
+
+def read_trends(classroom_id: str, weeks: int, window: int, top_k: int):
+    conn = sqlite3.connect(settings.database_path)
+    try:
+        return trends.get_trends(conn, classroom_id, weeks, window, top_k)
+    finally:
+        conn.close()
+
+@router.get(
+    "/trends/{classroom_id}",
+    response_model=TrendsResponse,
+    responses={
+        404: {"model": ErrorResponse, "description": "No analyses for this classroom"},
+        503: {"model": ErrorResponse, "description": "Trends database not available"}
+    }
+)
+async def trends_endpoint(
+    classroom_id: str,
+    weeks: int = Query(12, ge=1, le=260, description="Number of most recent weeks to return"),
+    window: int = Query(4, ge=1, le=52, description="Weeks in the rolling sentiment mean"),
+    top_k: int = Query(5, ge=1, le=50, description="Number of themes/improvements to return")
+):
+    if not os.path.exists(settings.database_path):
+        raise HTTPException(status_code=503, detail="Trends database not available")
+    try:
+        result = await asyncio.to_thread(read_trends, classroom_id, weeks, window, top_k)
+    except sqlite3.OperationalError as e:
+        logger.error(f"Trends query failed: {e}")
+        raise HTTPException(status_code=503, detail="Trends database not available")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No analyses found for classroom {classroom_id}")
+    return result
 
 @router.get("/health")
 async def health_check(request: Request):
@@ -42,3 +108,7 @@ async def health_check(request: Request):
         "status": "ok", 
         "model_loaded": is_loaded
     }
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    return metrics.snapshot()
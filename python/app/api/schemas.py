@@ -21,8 +21,47 @@ class AnalysisResponse(BaseModel):
     improvements: List[str] = Field(..., description="Areas for improvement")
     summary: str = Field(..., description="Concise summary of the feedback (max 3 sentences)")
     confidence: Literal["low", "medium", "high"] = Field(..., description="Confidence level based on data volume")
+    approximate: bool = Field(False, description="True when served from the semantic cache for a near-identical feedback set")
     processing_time_ms: int = Field(..., description="Time taken to process the request in milliseconds")
 
+class WeeklySentiment(BaseModel):
+    week_start: str = Field(..., description="Monday of the week (YYYY-MM-DD)")
+    session_count: int
+    mean_sentiment: float
+    rolling_mean_sentiment: float = Field(..., description="Session-weighted mean over the trailing window of weeks")
+
+class RankedItem(BaseModel):
+    label: str
+    count: int = Field(..., description="Number of sessions mentioning this label")
+
+class TrendsResponse(BaseModel):
+    classroom_id: str
+    total_sessions: int
+    weeks: List[WeeklySentiment]
+    top_themes: List[RankedItem]
+    top_improvements: List[RankedItem]
+
+class StageAllocation(BaseModel):
+    stage: str
+    calls: int
+    mean_peak_kib: float = Field(..., description="Mean tracemalloc peak per call (process-wide, approximate under concurrency)")
+    max_peak_kib: float
+
+class AllocationSite(BaseModel):
+    location: str = Field(..., description="file:line of the allocating statement")
+    size_kib: float
+    blocks: int
+
+class ProfileResponse(BaseModel):
+    mode: Literal["duration", "requests"]
+    duration_seconds: float
+    interval_ms: float
+    samples: int
+    requests_profiled: Optional[int] = None
+    folded: str = Field(..., description="Collapsed stacks ('frame;frame;frame count' per line), ready for flamegraph.pl or speedscope")
+    stage_allocations: Optional[List[StageAllocation]] = None
+    top_allocations: Optional[List[AllocationSite]] = None
+
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
@@ -0,0 +1,92 @@
+import json
+import re
+import orjson
+from typing import Any, Callable, Union
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from app.api.schemas import AnalysisResponse
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Per-request fields that bracket every other field in AnalysisResponse's
+# declared order; cached bodies store only what sits between them.
+_SESSION_PREFIX = b'{"session_id":'
+_EXACT_SUFFIX = b',"approximate":false,"processing_time_ms":'
+_APPROXIMATE_SUFFIX = b',"approximate":true,"processing_time_ms":'
+_PER_REQUEST_FIELDS = {"session_id", "approximate", "processing_time_ms"}
+
+# orjson reads integers beyond 64 bits as floats; any such literal has 19+ digits
+_LONG_DIGITS = re.compile(r"[0-9]{19}")
+_LONG_DIGITS_BYTES = re.compile(rb"[0-9]{19}")
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    orjson.loads, falling back to stdlib json where the two differ: NaN and
+    Infinity literals (orjson rejects them) and integers beyond 64 bits
+    (orjson rounds them to floats). Switching parsers thus changes no result.
+    Malformed input still raises json.JSONDecodeError.
+    """
+    long_digits = _LONG_DIGITS_BYTES if isinstance(data, bytes) else _LONG_DIGITS
+    if long_digits.search(data):
+        return json.loads(data)
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+class ORJSONRequest(Request):
+    """Request whose JSON body is decoded with orjson instead of stdlib json."""
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            # FastAPI turns json.JSONDecodeError into a 422
+            self._json = loads(await self.body())
+        return self._json
+
+class ORJSONRoute(APIRoute):
+    """APIRoute that hands endpoints an ORJSONRequest."""
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+
+        async def orjson_route_handler(request: Request) -> Response:
+            return await original_handler(ORJSONRequest(request.scope, request.receive))
+
+        return orjson_route_handler
+
+def dump_analysis(response: AnalysisResponse) -> bytes:
+    """
+    Serializes an already-validated AnalysisResponse straight to JSON bytes,
+    skipping FastAPI's response_model re-validation and jsonable_encoder.
+    """
+    return orjson.dumps(response.model_dump())
+
+def encode_cached_analysis(response: AnalysisResponse) -> bytes:
+    """
+    Pre-serializes the request-independent part of a response for the cache:
+    every field except session_id, approximate and processing_time_ms.
+    """
+    payload = response.model_dump(exclude=_PER_REQUEST_FIELDS)
+    # Strip the outer braces; render_cached_analysis adds them back.
+    return orjson.dumps(payload)[1:-1]
+
+def render_cached_analysis(
+    fragment: bytes,
+    session_id: str,
+    processing_time_ms: int,
+    approximate: bool = False
+) -> bytes:
+    """
+    Builds a full AnalysisResponse body from a cached fragment without
+    constructing or validating a model.
+    """
+    return b"".join((
+        _SESSION_PREFIX,
+        orjson.dumps(session_id),
+        b",",
+        fragment,
+        _APPROXIMATE_SUFFIX if approximate else _EXACT_SUFFIX,
+        str(processing_time_ms).encode("ascii"),
+        b"}",
+    ))
+
+def json_bytes_response(body: bytes) -> Response:
+    return Response(content=body, media_type=JSON_MEDIA_TYPE)
@@ -1,12 +1,32 @@
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     model_path: str = "./models/phi-4-mini-onnx"
+    database_path: str = "database.db"
     max_feedback_items: int = 500
     cache_maxsize: int = 128
     cache_ttl_seconds: int = 3600
+    cache_key_normalized: bool = False
+    token_cache_maxsize: int = 8192
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.9
+    semantic_cache_maxsize: int = 256
+    semantic_cache_dim: int = 4096
+    semantic_cache_poll_tolerance: float = 0.25
     cors_origins: list[str] = ["http://localhost:3000"]
     log_level: str = "INFO"
+    disconnect_poll_interval_seconds: float = 0.25
+    cpu_pool_workers: int = 2
+    cpu_offload_min_items: int = 100
+    loop_lag_interval_seconds: float = 0.5
+    admin_token: str = ""
+    proxy_replicas: list[str] = []
+    proxy_routing_key: Literal["session_id", "content"] = "session_id"
+    proxy_virtual_nodes: int = 100
+    proxy_max_inflight_per_replica: int = 8
+    proxy_replica_cooldown_seconds: float = 5.0
+    proxy_timeout_seconds: float = 300.0
 
     model_config = SettingsConfigDict(env_file=".env", env_ignore_empty=True, extra="ignore")
 
@@ -0,0 +1,23 @@
+import threading
+
+class GenerationCancelled(Exception):
+    """Raised when a generation is aborted through its CancellationToken."""
+
+class CancellationToken:
+    """
+    Cross-thread cancellation flag shared between the request coroutine
+    and the engine's token loop (which runs inside asyncio.to_thread).
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise GenerationCancelled("Generation cancelled by caller")
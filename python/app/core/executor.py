@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import multiprocessing
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.core import preprocessor, prompt_builder
+from app.core.preprocessor import PreprocessedData
+from app.utils.cache import analysis_cache
+from app.utils.metrics import metrics
+from app.utils.semantic_cache import embed_feedback
+
+logger = logging.getLogger(__name__)
+
+PollStats = Optional[Dict[str, List[int]]]
+
+@dataclass
+class PreparedAnalysis:
+    preprocessed: PreprocessedData
+    prompt_parts: prompt_builder.PromptParts
+    semantic_vector: Optional[np.ndarray]
+
+    @property
+    def user_prompt(self) -> str:
+        return self.prompt_parts.render()
+
+# --- Stage functions ---
+# Module-level and fed plain lists/dicts (never the pydantic request) so they
+# pickle cheaply into worker processes.
+
+def compute_cache_key(feedback: List[str], poll_stats: PollStats) -> str:
+    return analysis_cache.make_key(feedback, poll_stats)
+
+def preprocess_and_key(session_id: str, feedback: List[str], poll_stats: PollStats) -> Tuple[PreprocessedData, str]:
+    preprocessed = preprocessor.preprocess_items(session_id, feedback, poll_stats)
+    key = analysis_cache.make_key(preprocessed.cleaned_feedback, poll_stats, normalized=True)
+    return preprocessed, key
+
+def compute_normalized_cache_key(session_id: str, feedback: List[str], poll_stats: PollStats) -> str:
+    """The normalized key alone, for callers (the proxy) that have no use for the preprocessed data."""
+    return preprocess_and_key(session_id, feedback, poll_stats)[1]
+
+def prepare_analysis(
+    session_id: str,
+    feedback: List[str],
+    poll_stats: PollStats,
+    preprocessed: Optional[PreprocessedData],
+    embed: bool
+) -> PreparedAnalysis:
+    """Preprocess (unless already done), build the user prompt and embed for the semantic cache."""
+    if preprocessed is None:
+        preprocessed = preprocessor.preprocess_items(session_id, feedback, poll_stats)
+    return PreparedAnalysis(
+        preprocessed=preprocessed,
+        prompt_parts=prompt_builder.build_prompt_parts(preprocessed),
+        semantic_vector=embed_feedback(preprocessed.cleaned_feedback) if embed else None
+    )
+
+# --- Pool management ---
+
+_pool: Optional[Executor] = None
+
+def _free_threaded() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+def _mp_context():
+    """
+    Never fork: the pool starts lazily from a process that already runs
+    threads (asyncio executor, ORT, the profiler sampler), and forked workers
+    would inherit their state, e.g. an active tracemalloc session, for life.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def get_pool() -> Optional[Executor]:
+    """Lazily starts the CPU pool; None when offloading is disabled."""
+    global _pool
+    if settings.cpu_pool_workers <= 0:
+        return None
+    if _pool is None:
+        if _free_threaded():
+            # No GIL: threads run in parallel without pickling anything
+            _pool = ThreadPoolExecutor(max_workers=settings.cpu_pool_workers, thread_name_prefix="cpu-stage")
+        else:
+            _pool = ProcessPoolExecutor(max_workers=settings.cpu_pool_workers, mp_context=_mp_context())
+        logger.info(f"Started {type(_pool).__name__} with {settings.cpu_pool_workers} workers for CPU stages")
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def run_stage(size: int, fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs a CPU-bound stage inline for small payloads, or in the pool once the
+    payload has at least `cpu_offload_min_items` items, so large requests do
+    not block the event loop.
+    """
+    pool = get_pool() if size >= settings.cpu_offload_min_items else None
+    if pool is None:
+        return fn(*args)
+    metrics.increment("cpu_stages_offloaded")
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
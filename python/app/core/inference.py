@@ -1,5 +1,10 @@
 import onnxruntime_genai as og
 import logging
+from typing import Optional, Sequence, Union
+import numpy as np
+from app.core.cancellation import CancellationToken, GenerationCancelled
+from app.core.prompt_builder import PromptParts
+from app.core.tokenization import PromptTokenizer
 
 logger = logging.getLogger(__name__)
 
@@ -9,30 +14,47 @@ class Phi4MiniEngine:
         try:
             self.model = og.Model(model_path)
             self.tokenizer = og.Tokenizer(self.model)
+            self.prompt_tokenizer = PromptTokenizer(self.tokenizer.encode)
             logger.info("Model loaded successfully.")
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise RuntimeError(f"Could not load model from {model_path}") from e
 
-    def generate(self, prompt: str, max_tokens: int = 1024) -> str:
+    def encode_chat(self, system_prompt: str, parts: PromptParts, retry: bool = False) -> np.ndarray:
+        """Tokenizes the chat prompt piecewise, reusing cached template and line tokens."""
+        return self.prompt_tokenizer.encode_chat(system_prompt, parts, retry)
+
+    def generate(
+        self,
+        prompt: Union[str, Sequence[int]],
+        max_tokens: int = 1024,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> str:
         """
         Generates text completion using the Generator API.
+        `prompt` is either a string or an already tokenized prompt (see
+        encode_chat); `max_tokens` bounds the new tokens only.
         Returns ONLY the new tokens (not the echoed prompt).
+        Raises GenerationCancelled as soon as cancel_token is set.
         """
+        generator = None
         try:
-            params = og.GeneratorParams(self.model)
-            params.set_search_options(max_length=max_tokens, temperature=0.1, top_p=0.9)
-
-            # Encode prompt
-            input_tokens = self.tokenizer.encode(prompt)
+            # Encode prompt (unless it arrives pre-tokenized)
+            input_tokens = self.tokenizer.encode(prompt) if isinstance(prompt, str) else prompt
             input_length = len(input_tokens)
 
+            # max_length counts the prompt too, so budget from the exact prompt length
+            params = og.GeneratorParams(self.model)
+            params.set_search_options(max_length=input_length + max_tokens, temperature=0.1, top_p=0.9)
+
             # Create generator and feed input tokens
             generator = og.Generator(self.model, params)
             generator.append_tokens(input_tokens)
 
-            # Generate tokens one by one
+            # Generate tokens one by one, checking for cancellation per token
             while not generator.is_done():
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
                 generator.generate_next_token()
 
             # Get the FULL sequence and decode ONLY the new tokens
@@ -45,6 +67,13 @@ class Phi4MiniEngine:
 
             return decoded_output.strip()
 
+        except GenerationCancelled:
+            logger.info("Generation cancelled, releasing generator")
+            raise
         except Exception as e:
             logger.error(f"Inference failed: {e}")
             raise
+        finally:
+            # Drop the generator (and its KV cache) now rather than when the
+            # exception traceback is eventually cleared.
+            del generator
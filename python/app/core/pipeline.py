@@ -1,69 +1,200 @@
 import time
 import asyncio
 import logging
+from typing import Dict, Optional, Union
 from app.api.schemas import FeedbackRequest, AnalysisResponse
-from app.core import preprocessor, prompt_builder, response_parser
+from app.api.serialization import encode_cached_analysis, render_cached_analysis
+from app.config import settings
+from app.core import executor, prompt_builder, response_parser
+from app.core.executor import PreparedAnalysis
+from app.core.preprocessor import PreprocessedData
 from app.core.inference import Phi4MiniEngine
+from app.core.cancellation import CancellationToken, GenerationCancelled
 from app.utils.cache import analysis_cache
+from app.utils.semantic_cache import semantic_cache
+from app.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
-SYS_START = '<' + '|system|' + '>'
-SYS_END = '<' + '|end|' + '>'
-USR_START = '<' + '|user|' + '>'
-USR_END = '<' + '|end|' + '>'
-ASST_START = '<' + '|assistant|' + '>'
+# A fresh analysis, or a pre-serialized JSON body straight from the cache
+AnalysisResult = Union[AnalysisResponse, bytes]
 
+# Single-flight registry: cache key -> future resolved when the leading
+# request for that key finishes (successfully or not).
+_inflight: Dict[str, asyncio.Future] = {}
+
+def _render_hit(fragment: bytes, request: FeedbackRequest, start_time: float) -> bytes:
+    logger.info(f"Cache hit for session {request.session_id}")
+    metrics.increment("cache_hits")
+    return render_cached_analysis(
+        fragment,
+        request.session_id,
+        int((time.perf_counter() - start_time) * 1000)
+    )
 
 async def analyze_feedback(
     request: FeedbackRequest,
-    engine: Phi4MiniEngine
-) -> AnalysisResponse:
+    engine: Phi4MiniEngine,
+    cancel_token: Optional[CancellationToken] = None
+) -> AnalysisResult:
     start_time = time.perf_counter()
+    if cancel_token is None:
+        cancel_token = CancellationToken()
 
-    # 1. Cache Check
-    cached_result = analysis_cache.get(request.feedback, request.poll_stats)
-    if cached_result:
-        logger.info(f"Cache hit for session {request.session_id}")
-        cached_result.session_id = request.session_id
-        cached_result.processing_time_ms = int((time.perf_counter() - start_time) * 1000)
-        return cached_result
+    # CPU-bound stages go through the executor, which moves large payloads
+    # off the event loop
+    size = len(request.feedback)
 
-    # 2. Preprocess
-    preprocessed = preprocessor.preprocess(request)
+    # 1. Cache key, computed once and reused for get/set/single-flight.
+    # Normalized keys need the redacted, NFKC-normalized text, so preprocessing
+    # moves ahead of the cache check in that mode.
+    preprocessed: Optional[PreprocessedData] = None
+    if settings.cache_key_normalized:
+        preprocessed, cache_key = await executor.run_stage(
+            size, executor.preprocess_and_key, request.session_id, request.feedback, request.poll_stats
+        )
+    else:
+        cache_key = await executor.run_stage(
+            size, executor.compute_cache_key, request.feedback, request.poll_stats
+        )
 
-    # 3. Build Prompt
-    system_prompt_text = prompt_builder.load_system_prompt()
-    user_prompt_text = prompt_builder.build_prompt(preprocessed)
+    # 2. Cache check, waiting on any in-flight generation for the same key
+    while True:
+        cached_fragment = analysis_cache.get(cache_key)
+        if cached_fragment is not None:
+            return _render_hit(cached_fragment, request, start_time)
+        leader = _inflight.get(cache_key)
+        if leader is None:
+            break
+        metrics.increment("single_flight_waits")
+        # Re-raises the leader's failure, so a failing input is generated
+        # once rather than once per waiter in turn
+        await asyncio.shield(leader)
+        # Leader finished: its result is now cached, or it was cancelled
+        # and we loop round to take over.
+
+    metrics.increment("cache_misses")
+    flight = asyncio.get_running_loop().create_future()
+    _inflight[cache_key] = flight
+    try:
+        # 3. Preprocess, build prompt and embed in one stage
+        prepared = await executor.run_stage(
+            size, executor.prepare_analysis, request.session_id, request.feedback,
+            request.poll_stats, preprocessed, settings.semantic_cache_enabled
+        )
+        if prepared.semantic_vector is not None:
+            approximate = _semantic_lookup(request, prepared, start_time)
+            if approximate is not None:
+                return approximate
+        return await _run_analysis(request, prepared, engine, cancel_token, cache_key, start_time)
+    except GenerationCancelled:
+        # Only this client went away; a follower takes over
+        raise
+    except Exception as e:
+        flight.set_exception(e)
+        # Mark it retrieved so there is no warning when nobody was waiting
+        flight.exception()
+        raise
+    finally:
+        del _inflight[cache_key]
+        if not flight.done():
+            flight.set_result(None)
+
+def _semantic_lookup(
+    request: FeedbackRequest,
+    prepared: PreparedAnalysis,
+    start_time: float
+) -> Optional[bytes]:
+    """Serves a near-identical earlier analysis, flagged as approximate."""
+    lookup_start = time.perf_counter()
+    match = semantic_cache.get(prepared.semantic_vector, prepared.preprocessed.confidence, request.poll_stats)
+    metrics.observe("semantic_cache_lookup_ms", (time.perf_counter() - lookup_start) * 1000)
+
+    if match is None:
+        metrics.increment("semantic_cache_misses")
+        return None
+
+    fragment, similarity = match
+    logger.info(f"Semantic cache hit for session {request.session_id} (similarity={similarity:.3f})")
+    metrics.increment("semantic_cache_hits")
+    metrics.observe("semantic_cache_similarity", similarity)
+    return render_cached_analysis(
+        fragment,
+        request.session_id,
+        int((time.perf_counter() - start_time) * 1000),
+        approximate=True
+    )
 
-    full_prompt = f"{SYS_START}\n{system_prompt_text}\n{SYS_END}\n{USR_START}\n{user_prompt_text}\n{USR_END}\n{ASST_START}\n"
+def _generate(
+    engine: Phi4MiniEngine,
+    system_prompt: str,
+    parts: prompt_builder.PromptParts,
+    retry: bool,
+    cancel_token: CancellationToken
+) -> str:
+    """
+    Runs in a worker thread. Engines with a tokenizer get the prompt as
+    tokens assembled from cached pieces; others get the rendered string.
+    """
+    encode_chat = getattr(engine, "encode_chat", None)
+    if encode_chat is None:
+        prompt = prompt_builder.build_chat_prompt(system_prompt, parts.render(), retry)
+    else:
+        prompt = encode_chat(system_prompt, parts, retry)
+        metrics.observe("prompt_tokens", len(prompt))
+    return engine.generate(prompt, cancel_token=cancel_token)
+
+async def infer_analysis(
+    session_id: str,
+    prepared: PreparedAnalysis,
+    engine: Phi4MiniEngine,
+    cancel_token: CancellationToken,
+    start_time: float
+) -> AnalysisResponse:
+    """
+    Runs inference on a prepared analysis and parses the output, retrying
+    once with a JSON-only instruction. Does not touch the caches.
+    """
+    preprocessed = prepared.preprocessed
+    system_prompt_text = prompt_builder.load_system_prompt()
 
     # 4. Inference with retry
     max_retries = 1
 
     for attempt in range(max_retries + 1):
         try:
-            raw_output = await asyncio.to_thread(engine.generate, full_prompt)
+            cancel_token.raise_if_cancelled()
+            try:
+                raw_output = await asyncio.to_thread(
+                    _generate, engine, system_prompt_text, prepared.prompt_parts, attempt > 0, cancel_token
+                )
+            except asyncio.CancelledError:
+                # The awaiting task was cancelled (e.g. server-side timeout);
+                # stop the worker thread at its next token.
+                cancel_token.cancel()
+                metrics.increment("generations_cancelled")
+                raise
             logger.info(f"Raw LLM output (first 500 chars): {raw_output[:500]}")
 
             # 5. Parse
             result = response_parser.parse_response(
                 raw_output,
                 preprocessed.confidence,
-                request.session_id
+                session_id
             )
 
             end_time = time.perf_counter()
             result.processing_time_ms = int((end_time - start_time) * 1000)
-
-            # 6. Cache
-            analysis_cache.set(request.feedback, request.poll_stats, result)
             return result
 
+        except GenerationCancelled:
+            logger.info(f"Generation cancelled for session {session_id}")
+            metrics.increment("generations_cancelled")
+            raise
         except ValueError as e:
             logger.warning(f"Attempt {attempt+1} failed to parse JSON: {e}")
             if attempt < max_retries:
-                full_prompt += "\nYou MUST return ONLY valid JSON. No other text."
+                # The next attempt appends the JSON-only instruction
                 continue
             else:
                 logger.error("All attempts failed.")
@@ -73,3 +204,25 @@ async def analyze_feedback(
             raise e
 
     raise RuntimeError("Unreachable")
+
+async def _run_analysis(
+    request: FeedbackRequest,
+    prepared: PreparedAnalysis,
+    engine: Phi4MiniEngine,
+    cancel_token: CancellationToken,
+    cache_key: str,
+    start_time: float
+) -> AnalysisResponse:
+    result = await infer_analysis(request.session_id, prepared, engine, cancel_token, start_time)
+
+    # 6. Cache
+    fragment = encode_cached_analysis(result)
+    analysis_cache.set(cache_key, fragment)
+    if prepared.semantic_vector is not None:
+        semantic_cache.set(
+            prepared.semantic_vector,
+            prepared.preprocessed.confidence,
+            request.poll_stats,
+            fragment
+        )
+    return result
@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Literal
 from app.api.schemas import FeedbackRequest
 from app.utils.ethical import sanity_check_input
+from app.utils.profiler import allocation_probe
 
 @dataclass
 class PreprocessedData:
@@ -47,15 +48,24 @@ def summarize_polls(poll_stats: Optional[Dict[str, List[int]]]) -> str:
     return "\n".join(summary_parts) if summary_parts else "No valid poll data."
 
 def preprocess(request: FeedbackRequest) -> PreprocessedData:
+    """Runs preprocess_items on a validated request."""
+    return preprocess_items(request.session_id, request.feedback, request.poll_stats)
+
+@allocation_probe("preprocess")
+def preprocess_items(
+    session_id: str,
+    feedback: List[str],
+    poll_stats: Optional[Dict[str, List[int]]]
+) -> PreprocessedData:
     """
-    Main preprocessing pipeline:
+    Main preprocessing pipeline, on plain (picklable) inputs:
     1. Sanity check (PII redact, length check)
     2. Normalize text
     3. Deduplicate
     4. Compute stats and confidence
     """
     # Step 1: Sanity check & Redaction
-    safe_feedback = sanity_check_input(request.feedback)
+    safe_feedback = sanity_check_input(feedback)
     
     # Step 2: Normalize
     normalized_feedback = [normalize_text(fb) for fb in safe_feedback]
@@ -70,10 +80,10 @@ def preprocess(request: FeedbackRequest) -> PreprocessedData:
             
     # Step 4: Compute metadata
     confidence = compute_confidence(len(deduped_feedback))
-    poll_summary = summarize_polls(request.poll_stats)
+    poll_summary = summarize_polls(poll_stats)
     
     return PreprocessedData(
-        session_id=request.session_id,
+        session_id=session_id,
         cleaned_feedback=deduped_feedback,
         poll_summary=poll_summary,
         confidence=confidence
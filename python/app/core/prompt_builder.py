@@ -1,5 +1,8 @@
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List
 from app.core.preprocessor import PreprocessedData
+from app.utils.profiler import allocation_probe
 
 # Load system prompt once at module level (or could be in a lifespan event)
 # For simplicity, we'll read it lazily or at import time if file exists.
@@ -11,27 +14,61 @@ def load_system_prompt() -> str:
     except FileNotFoundError:
         return "You are a helpful AI assistant. Return JSON only." # Fallback
 
-def build_prompt(data: PreprocessedData) -> str:
+SYS_START = '<' + '|system|' + '>'
+SYS_END = '<' + '|end|' + '>'
+USR_START = '<' + '|user|' + '>'
+USR_END = '<' + '|end|' + '>'
+ASST_START = '<' + '|assistant|' + '>'
+
+# Chat template around the user message (which is followed by a newline).
+# Every piece boundary is either right before a special token or right after
+# a newline that is followed by text, so tokenizing the pieces separately
+# gives the same tokens as tokenizing the whole prompt.
+CHAT_OPENING = f"{SYS_START}\n{{system_prompt}}\n{SYS_END}\n{USR_START}\n"
+CHAT_CLOSING = f"{USR_END}\n{ASST_START}\n"
+RETRY_SUFFIX = "\nYou MUST return ONLY valid JSON. No other text."
+
+@dataclass
+class PromptParts:
     """
-    Constructs the final user message for the LLM.
+    The user message split at newline boundaries: a per-request header, one
+    chunk per feedback line and a footer. Keeping the feedback lines separate
+    lets the engine tokenize each one through its line cache.
+    """
+    header: str
+    lines: List[str]
+    footer: str
+
+    def render(self) -> str:
+        return self.header + "".join(self.lines) + self.footer
+
+@allocation_probe("build_prompt")
+def build_prompt_parts(data: PreprocessedData) -> PromptParts:
+    """
+    Constructs the user message for the LLM as PromptParts.
     """
-    feedback_text = ""
     if not data.cleaned_feedback:
-        feedback_text = "No text feedback provided."
+        lines = ["No text feedback provided."]
     else:
-        # Create a bulleted list of feedback items
-        feedback_text = "\n".join([f"- {item}" for item in data.cleaned_feedback])
-
-    user_prompt = f"""
-SESSION: {data.session_id}
-FEEDBACK COUNT: {len(data.cleaned_feedback)}
+        # A bulleted list of feedback items
+        lines = [f"- {item}\n" for item in data.cleaned_feedback]
+        lines[-1] = lines[-1].rstrip("\n")
+    # The blank line stays with the last chunk so no newline run is split
+    lines[-1] += "\n\n"
 
-FEEDBACK ENTRIES:
-{feedback_text}
+    header = f"SESSION: {data.session_id}\nFEEDBACK COUNT: {len(data.cleaned_feedback)}\n\nFEEDBACK ENTRIES:\n"
+    footer = f"POLL STATISTICS:\n{data.poll_summary}\n\nAnalyze the above and return valid JSON matching the schema."
+    return PromptParts(header=header, lines=lines, footer=footer)
 
-POLL STATISTICS:
-{data.poll_summary}
+def build_prompt(data: PreprocessedData) -> str:
+    """
+    Constructs the final user message for the LLM.
+    """
+    return build_prompt_parts(data).render()
 
-Analyze the above and return valid JSON matching the schema.
-"""
-    return user_prompt.strip()
+def build_chat_prompt(system_prompt: str, user_prompt: str, retry: bool = False) -> str:
+    """The full Phi chat-format prompt as a string (for engines without a tokenizer)."""
+    prompt = CHAT_OPENING.format(system_prompt=system_prompt) + user_prompt + "\n" + CHAT_CLOSING
+    if retry:
+        prompt += RETRY_SUFFIX
+    return prompt
@@ -1,51 +1,73 @@
 import json
 import re
 import logging
-from typing import Any, Dict, Optional, Literal
+from typing import Any, Dict, Optional, Literal, Tuple
 from app.api.schemas import AnalysisResponse
+from app.api.serialization import loads
+from app.utils.profiler import allocation_probe
 
 logger = logging.getLogger(__name__)
 
-def extract_json(text: str) -> Optional[Dict[str, Any]]:
+# A JSON object opens with "{" followed by a key or "}"; prose like "{x}" never does.
+_OBJECT_OPEN = re.compile(r'\{\s*["}]')
+# Structural characters the scanner stops at; everything else is skipped in C.
+_STRUCTURAL = re.compile(r'["{}]')
+# Remainder of a JSON string after its opening quote (unrolled loop: linear,
+# no nested quantifiers that can backtrack).
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+def _find_object_span(text: str, start: int) -> Optional[Tuple[int, int]]:
     """
-    Attempts to extract a JSON object from a string using multiple strategies.
+    Finds the first balanced top-level {...} at or after `start`, ignoring braces
+    inside JSON strings. Returns (start, end) or None if there is none.
     """
-    # Strategy 1: Try parsing the entire text as JSON
-    try:
-        return json.loads(text.strip())
-    except json.JSONDecodeError:
-        pass
+    opener = _OBJECT_OPEN.search(text, start)
+    if opener is None:
+        return None
 
-    # Strategy 2: Find JSON between ```json ... ``` code blocks
-    code_block_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if code_block_match:
-        try:
-            return json.loads(code_block_match.group(1))
-        except json.JSONDecodeError:
-            pass
+    obj_start = opener.start()
+    depth = 0
+    pos = obj_start
+    while True:
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            return None  # Unbalanced (e.g. truncated output)
+        char = match.group()
+        if char == '"':
+            tail = _STRING_TAIL.match(text, match.end())
+            if tail is None:
+                return None  # Unterminated string swallows the rest
+            pos = tail.end()
+            continue
+        if char == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return obj_start, match.end()
+        pos = match.end()
 
-    # Strategy 3: Find the first { ... } block using brace matching
-    start = text.find('{')
-    if start != -1:
-        depth = 0
-        for i in range(start, len(text)):
-            if text[i] == '{':
-                depth += 1
-            elif text[i] == '}':
-                depth -= 1
-                if depth == 0:
-                    try:
-                        return json.loads(text[start:i+1])
-                    except json.JSONDecodeError:
-                        break
-
-    # Strategy 4: Greedy regex for any JSON-like object
-    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
-    if json_match:
+@allocation_probe("extract_json")
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Extracts the first decodable JSON object from model output in a single
+    forward pass: each candidate {...} span is found by a string-aware brace
+    scan and handed to orjson (stdlib json where they differ, as the old
+    parser accepted e.g. NaN). Candidates never overlap, so the total work is
+    linear in the length of the text.
+    """
+    pos = 0
+    while True:
+        span = _find_object_span(text, pos)
+        if span is None:
+            break
+        obj_start, obj_end = span
         try:
-            return json.loads(json_match.group())
+            return loads(text[obj_start:obj_end])
         except json.JSONDecodeError:
             pass
+        # e.g. '{"draft": ...}' the model abandoned before the real object
+        pos = obj_end
 
     logger.error(f"Could not extract JSON from: {text[:300]}...")
     return None
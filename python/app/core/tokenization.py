@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Sequence
+import numpy as np
+from app.config import settings
+from app.core.prompt_builder import CHAT_CLOSING, CHAT_OPENING, RETRY_SUFFIX, PromptParts, build_chat_prompt
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TOKEN_DTYPE = np.int32
+
+# A prompt with every kind of fragment boundary, for the startup check
+_PROBE_SYSTEM = "You analyze classroom feedback."
+_PROBE_PARTS = PromptParts(
+    header="SESSION: probe\nFEEDBACK COUNT: 2\n\nFEEDBACK ENTRIES:\n",
+    lines=["- Great pace today\n", "- Too fast on slide 4!\n\n"],
+    footer="POLL STATISTICS:\nunderstanding: mean 3.5\n\nAnalyze the above and return valid JSON matching the schema."
+)
+
+class PromptTokenizer:
+    """
+    Assembles chat prompts as token sequences instead of encoding the whole
+    string on every call:
+    - template pieces (chat markers + system prompt, closing, retry closing)
+      are tokenized once and reused;
+    - each feedback line goes through an LRU keyed by its content hash, so
+      lines repeated across re-submissions are never re-encoded;
+    - only the short per-request header and footer are encoded every time.
+    The retry variant swaps in a pre-tokenized closing with the instruction
+    appended, so a retry re-encodes nothing.
+
+    Joined fragments only equal the whole-prompt encoding if the tokenizer
+    adds nothing per call. SentencePiece/Llama-style tokenizers prepend a BOS
+    token or a leading-space marker to every encode, so this is checked once
+    on construction and such tokenizers get the whole prompt encoded instead.
+    """
+    def __init__(self, encode: Callable[[str], Sequence[int]], maxsize: int = settings.token_cache_maxsize):
+        self._encode = encode
+        self.maxsize = maxsize
+        self._lines: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._templates: Dict[str, np.ndarray] = {}
+        # Generation runs in worker threads
+        self._lock = threading.Lock()
+        self.piecewise = self._assembles_exactly()
+        if not self.piecewise:
+            logger.warning("Tokenizer adds tokens per call; encoding prompts whole, without the token cache")
+
+    def _assembles_exactly(self) -> bool:
+        """Whether uncached fragment encodings of the probe prompt join up to its whole encoding."""
+        for retry in (False, True):
+            whole = self.encode(build_chat_prompt(_PROBE_SYSTEM, _PROBE_PARTS.render(), retry))
+            joined = self._assemble(_PROBE_SYSTEM, _PROBE_PARTS, retry, self.encode, self.encode)
+            if not np.array_equal(whole, joined):
+                return False
+        return True
+
+    def encode(self, text: str) -> np.ndarray:
+        return np.asarray(self._encode(text), dtype=TOKEN_DTYPE)
+
+    def encode_template(self, text: str) -> np.ndarray:
+        tokens = self._templates.get(text)
+        if tokens is None:
+            tokens = self.encode(text)
+            with self._lock:
+                if len(self._templates) >= 16:
+                    # Only changes when the system prompt file is edited
+                    self._templates.clear()
+                self._templates[text] = tokens
+        return tokens
+
+    def encode_line(self, text: str) -> np.ndarray:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            tokens = self._lines.get(key)
+            if tokens is not None:
+                self._lines.move_to_end(key)
+        if tokens is not None:
+            metrics.increment("token_cache_hits")
+            return tokens
+
+        metrics.increment("token_cache_misses")
+        tokens = self.encode(text)
+        with self._lock:
+            self._lines[key] = tokens
+            if len(self._lines) > self.maxsize:
+                self._lines.popitem(last=False)
+        return tokens
+
+    def encode_chat(self, system_prompt: str, parts: PromptParts, retry: bool = False) -> np.ndarray:
+        """Token-level equivalent of prompt_builder.build_chat_prompt."""
+        if not self.piecewise:
+            return self.encode(build_chat_prompt(system_prompt, parts.render(), retry))
+        return self._assemble(system_prompt, parts, retry, self.encode_template, self.encode_line)
+
+    def _assemble(
+        self,
+        system_prompt: str,
+        parts: PromptParts,
+        retry: bool,
+        template: Callable[[str], np.ndarray],
+        line: Callable[[str], np.ndarray]
+    ) -> np.ndarray:
+        closing = CHAT_CLOSING + RETRY_SUFFIX if retry else CHAT_CLOSING
+        pieces = [template(CHAT_OPENING.format(system_prompt=system_prompt)), self.encode(parts.header)]
+        pieces.extend(line(text) for text in parts.lines)
+        pieces.append(self.encode(parts.footer + "\n"))
+        pieces.append(template(closing))
+        return np.concatenate(pieces)
@@ -0,0 +1,208 @@
+import sqlite3
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+from app.api.schemas import RankedItem, TrendsResponse, WeeklySentiment
+
+# Rollups are maintained by triggers on feedback_summaries, so every writer
+# (seed script, bulk analysis, the main backend) keeps them current and a
+# trends query reads O(buckets) rows instead of every session's insights JSON.
+
+ROLLUP_TABLES = ("classroom_week_sentiment", "classroom_theme_counts", "classroom_improvement_counts")
+
+# Monday of the week containing the session start
+_WEEK_EXPR = "date(s.started_at, 'weekday 0', '-6 days')"
+# Placeholder values models emit when there is nothing to improve
+_IGNORED_LABELS = "('', 'none', 'n/a')"
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS classroom_week_sentiment (
+    classroom_id TEXT NOT NULL,
+    week_start TEXT NOT NULL,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    sentiment_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (classroom_id, week_start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS classroom_theme_counts (
+    classroom_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (classroom_id, label)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_theme_counts_rank ON classroom_theme_counts (classroom_id, count DESC);
+CREATE TABLE IF NOT EXISTS classroom_improvement_counts (
+    classroom_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (classroom_id, label)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_improvement_counts_rank ON classroom_improvement_counts (classroom_id, count DESC);
+CREATE INDEX IF NOT EXISTS idx_feedback_summaries_session ON feedback_summaries (session_id);
+"""
+
+def _insights(row: str) -> str:
+    # json_each() raises on malformed JSON, which would abort the write itself
+    return f"CASE WHEN json_valid({row}.insights) THEN {row}.insights ELSE '{{}}' END"
+
+def _labels(row: str, field: str) -> str:
+    return (
+        f"SELECT DISTINCT lower(trim(j.value)) AS label FROM json_each({_insights(row)}, '$.{field}') j "
+        f"WHERE j.type = 'text' AND lower(trim(j.value)) NOT IN {_IGNORED_LABELS}"
+    )
+
+def _add_statements(row: str) -> str:
+    sentiment = f"CAST(json_extract({_insights(row)}, '$.sentiment_score') AS REAL)"
+    statements = [f"""
+    INSERT INTO classroom_week_sentiment (classroom_id, week_start, session_count, sentiment_sum)
+    SELECT s.classroom_id, {_WEEK_EXPR}, 1, {sentiment}
+    FROM class_sessions s WHERE s.id = {row}.session_id AND {sentiment} IS NOT NULL
+    ON CONFLICT (classroom_id, week_start) DO UPDATE SET
+        session_count = session_count + 1,
+        sentiment_sum = sentiment_sum + excluded.sentiment_sum;"""]
+    for table, field in (("classroom_theme_counts", "themes"), ("classroom_improvement_counts", "improvements")):
+        statements.append(f"""
+    INSERT INTO {table} (classroom_id, label, count)
+    SELECT s.classroom_id, l.label, 1
+    FROM class_sessions s, ({_labels(row, field)}) l
+    WHERE s.id = {row}.session_id
+    ON CONFLICT (classroom_id, label) DO UPDATE SET count = count + 1;""")
+    return "".join(statements)
+
+def _remove_statements(row: str) -> str:
+    sentiment = f"CAST(json_extract({_insights(row)}, '$.sentiment_score') AS REAL)"
+    classroom = f"(SELECT classroom_id FROM class_sessions WHERE id = {row}.session_id)"
+    statements = [f"""
+    UPDATE classroom_week_sentiment SET
+        session_count = session_count - 1,
+        sentiment_sum = sentiment_sum - {sentiment}
+    WHERE (classroom_id, week_start) = (
+        SELECT s.classroom_id, {_WEEK_EXPR} FROM class_sessions s WHERE s.id = {row}.session_id
+    ) AND {sentiment} IS NOT NULL;
+    DELETE FROM classroom_week_sentiment WHERE classroom_id = {classroom} AND session_count <= 0;"""]
+    for table, field in (("classroom_theme_counts", "themes"), ("classroom_improvement_counts", "improvements")):
+        statements.append(f"""
+    UPDATE {table} SET count = count - 1
+    WHERE classroom_id = {classroom} AND label IN ({_labels(row, field)});
+    DELETE FROM {table} WHERE classroom_id = {classroom} AND count <= 0;""")
+    return "".join(statements)
+
+ROLLUP_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS trg_feedback_summaries_rollup_insert
+AFTER INSERT ON feedback_summaries
+BEGIN{_add_statements("NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_feedback_summaries_rollup_update
+AFTER UPDATE OF session_id, insights ON feedback_summaries
+BEGIN{_remove_statements("OLD")}{_add_statements("NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_feedback_summaries_rollup_delete
+AFTER DELETE ON feedback_summaries
+BEGIN{_remove_statements("OLD")}
+END;
+"""
+
+def rebuild_rollups(conn: sqlite3.Connection):
+    """Recomputes every rollup from feedback_summaries (used to backfill)."""
+    with conn:
+        for table in ROLLUP_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        sentiment = f"CAST(json_extract({_insights('f')}, '$.sentiment_score') AS REAL)"
+        conn.execute(f"""
+            INSERT INTO classroom_week_sentiment (classroom_id, week_start, session_count, sentiment_sum)
+            SELECT s.classroom_id, {_WEEK_EXPR}, count(*), sum({sentiment})
+            FROM feedback_summaries f JOIN class_sessions s ON s.id = f.session_id
+            WHERE {sentiment} IS NOT NULL
+            GROUP BY 1, 2
+        """)
+        for table, field in (("classroom_theme_counts", "themes"), ("classroom_improvement_counts", "improvements")):
+            # count(DISTINCT ...) so a label repeated within one summary counts once
+            conn.execute(f"""
+                INSERT INTO {table} (classroom_id, label, count)
+                SELECT s.classroom_id, lower(trim(j.value)), count(DISTINCT f.rowid)
+                FROM feedback_summaries f
+                JOIN class_sessions s ON s.id = f.session_id,
+                json_each({_insights('f')}, '$.{field}') j
+                WHERE j.type = 'text' AND lower(trim(j.value)) NOT IN {_IGNORED_LABELS}
+                GROUP BY 1, 2
+            """)
+
+def ensure_rollup_schema(conn: sqlite3.Connection):
+    """
+    Creates the rollup tables and triggers if missing. When the tables are
+    new but summaries already exist, backfills them once.
+    """
+    existing = conn.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (ROLLUP_TABLES[0],)
+    ).fetchone()[0]
+    conn.executescript(ROLLUP_SCHEMA + ROLLUP_TRIGGERS)
+    if not existing:
+        rebuild_rollups(conn)
+
+def _ranked(conn: sqlite3.Connection, table: str, classroom_id: str, top_k: int) -> List[RankedItem]:
+    rows = conn.execute(
+        f"SELECT label, count FROM {table} WHERE classroom_id = ? ORDER BY count DESC, label LIMIT ?",
+        (classroom_id, top_k)
+    ).fetchall()
+    return [RankedItem(label=label, count=count) for label, count in rows]
+
+def _weekly(buckets: List[Tuple[str, int, float]], weeks: int, window: int) -> List[WeeklySentiment]:
+    """
+    Per-week means plus a session-weighted rolling mean over the trailing
+    `window` calendar weeks. Weeks without analyses have no bucket, so the
+    span is bounded by date rather than by bucket count.
+    """
+    result = []
+    starts = [date.fromisoformat(week_start) for week_start, _, _ in buckets]
+    first = 0
+    for i, (week_start, count, total) in enumerate(buckets):
+        while starts[first] < starts[i] - timedelta(weeks=window - 1):
+            first += 1
+        span = buckets[first:i + 1]
+        span_count = sum(c for _, c, _ in span)
+        span_total = sum(t for _, _, t in span)
+        result.append(WeeklySentiment(
+            week_start=week_start,
+            session_count=count,
+            mean_sentiment=round(total / count, 4),
+            rolling_mean_sentiment=round(span_total / span_count, 4)
+        ))
+    return result[-weeks:]
+
+def get_trends(
+    conn: sqlite3.Connection,
+    classroom_id: str,
+    weeks: int = 12,
+    window: int = 4,
+    top_k: int = 5
+) -> Optional[TrendsResponse]:
+    """Reads a classroom's trends from the rollups; None if it has no analyses."""
+    # The most recent `weeks` buckets, plus whatever buckets fall in the
+    # window-1 calendar weeks before the oldest of them
+    buckets = conn.execute(
+        """
+        SELECT week_start, session_count, sentiment_sum FROM classroom_week_sentiment
+        WHERE classroom_id = ? AND week_start >= date((
+            SELECT min(week_start) FROM (
+                SELECT week_start FROM classroom_week_sentiment
+                WHERE classroom_id = ? ORDER BY week_start DESC LIMIT ?
+            )
+        ), ?)
+        ORDER BY week_start
+        """,
+        (classroom_id, classroom_id, weeks, f"-{(window - 1) * 7} days")
+    ).fetchall()
+    if not buckets:
+        return None
+
+    total_sessions = conn.execute(
+        "SELECT sum(session_count) FROM classroom_week_sentiment WHERE classroom_id = ?",
+        (classroom_id,)
+    ).fetchone()[0]
+
+    return TrendsResponse(
+        classroom_id=classroom_id,
+        total_sessions=total_sessions,
+        weeks=_weekly(buckets, weeks, window),
+        top_themes=_ranked(conn, "classroom_theme_counts", classroom_id, top_k),
+        top_improvements=_ranked(conn, "classroom_improvement_counts", classroom_id, top_k)
+    )
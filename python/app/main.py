@@ -1,11 +1,18 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.config import settings
 from app.api.routes import router
+from app.api.admin import admin_router
 from app.core.inference import Phi4MiniEngine
+from app.core.trends import ensure_rollup_schema
+from app.core import executor
+from app.utils.metrics import monitor_event_loop_lag
+import asyncio
 import logging
 import os
+import sqlite3
 
 # Setup logging
 logging.basicConfig(level=settings.log_level)
@@ -28,7 +35,7 @@ async def lifespan(app: FastAPI):
         
         # --- Mock Engine Definition ---
         class MockPhi4MiniEngine:
-            def generate(self, prompt: str, max_tokens: int = 512) -> str:
+            def generate(self, prompt: str, max_tokens: int = 512, cancel_token=None) -> str:
                 return '''
                 {
                   "sentiment_score": 0.85,
@@ -42,18 +49,35 @@ async def lifespan(app: FastAPI):
         # -----------------------------
         
         app.state.engine = MockPhi4MiniEngine()
+
+    # Make sure the trend rollups (and their maintenance triggers) exist
+    if os.path.exists(settings.database_path):
+        try:
+            conn = sqlite3.connect(settings.database_path)
+            try:
+                ensure_rollup_schema(conn)
+            finally:
+                conn.close()
+            logger.info("Startup: trend rollups ready.")
+        except sqlite3.Error as e:
+            logger.warning(f"Startup: could not prepare trend rollups: {e}")
+
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag(settings.loop_lag_interval_seconds))
         
     yield
     
     # Cleanup on shutdown (if needed)
     logger.info("Shutdown: cleaning up resources...")
+    lag_monitor.cancel()
+    executor.shutdown_pool()
     if hasattr(app.state, "engine"):
         del app.state.engine
 
 app = FastAPI(
     title="Classroom Feedback Analysis AI Service",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -65,6 +89,7 @@ app.add_middleware(
 )
 
 app.include_router(router, prefix="/api/v1")
+app.include_router(admin_router, prefix="/api/v1")
 
 @app.get("/")
 async def root():
@@ -0,0 +1,209 @@
+"""
+Cache-affinity proxy for running several replicas of the service.
+
+Each replica keeps its own in-process analysis cache, so spraying requests
+across N replicas gives roughly a 1/N hit rate. This proxy consistent-hashes
+every /analyze request (on session_id or on the feedback content key) to one
+replica, so re-submissions land where the cached analysis lives. It falls
+back to the next replica on the ring when the owner is down or saturated.
+
+    PROXY_REPLICAS='["http://127.0.0.1:8001","http://127.0.0.1:8002"]' uvicorn app.proxy:app --port 8000
+"""
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import time
+import httpx
+import orjson
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse
+from app.config import settings
+from app.core import executor
+from app.utils.hash_ring import HashRing
+from app.utils.metrics import metrics
+
+logging.basicConfig(level=settings.log_level)
+logger = logging.getLogger(__name__)
+
+# Hop-by-hop or recomputed headers that must not be copied between legs
+_SKIP_HEADERS = {"host", "content-length", "transfer-encoding", "connection", "keep-alive"}
+# httpx hands back the decoded body, so its encoding must not be claimed downstream
+_SKIP_RESPONSE_HEADERS = _SKIP_HEADERS | {"content-encoding"}
+
+async def routing_key(path: str, body: bytes, mode: str) -> str:
+    """
+    The ring key for a request. /analyze requests hash on session_id or, in
+    "content" mode, on the same content key the replicas cache under (so with
+    CACHE_KEY_NORMALIZED the proxy preprocesses the feedback as they do);
+    other paths hash on the path itself. Content keys of large payloads are
+    computed in the CPU pool, as on the replicas.
+    """
+    if not path.endswith("/analyze") or not body:
+        return path
+    try:
+        payload = orjson.loads(body)
+        if mode == "content":
+            feedback, poll_stats = payload["feedback"], payload.get("poll_stats")
+            if settings.cache_key_normalized:
+                return await executor.run_stage(
+                    len(feedback), executor.compute_normalized_cache_key, payload.get("session_id", ""), feedback, poll_stats
+                )
+            return await executor.run_stage(len(feedback), executor.compute_cache_key, feedback, poll_stats)
+        session_id = payload["session_id"]
+    except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError, ValueError):
+        # Let the replica produce the validation error
+        return path
+    return session_id if isinstance(session_id, str) else path
+
+@dataclass
+class ReplicaState:
+    inflight: int = 0
+    down_until: float = 0.0
+
+class AffinityRouter:
+    """Picks a replica per request from the hash ring and forwards the request to it."""
+    def __init__(
+        self,
+        replicas: List[str],
+        vnodes: int = settings.proxy_virtual_nodes,
+        max_inflight: int = settings.proxy_max_inflight_per_replica,
+        cooldown_seconds: float = settings.proxy_replica_cooldown_seconds,
+        timeout_seconds: float = settings.proxy_timeout_seconds
+    ):
+        if not replicas:
+            raise ValueError("PROXY_REPLICAS is empty")
+        self.ring = HashRing([url.rstrip("/") for url in replicas], vnodes)
+        self.states: Dict[str, ReplicaState] = {node: ReplicaState() for node in self.ring.nodes}
+        self.max_inflight = max_inflight
+        self.cooldown_seconds = cooldown_seconds
+        self.client = httpx.AsyncClient(timeout=timeout_seconds)
+
+    def candidates(self, key: str) -> List[str]:
+        """
+        Live replicas in ring order. Saturated ones move behind the others,
+        so a hot owner spills over to its successor instead of queueing.
+        """
+        now = time.monotonic()
+        live = [node for node in self.ring.preference_list(key) if self.states[node].down_until <= now]
+        ready = [node for node in live if self.states[node].inflight < self.max_inflight]
+        if len(ready) < len(live) and ready:
+            metrics.increment("proxy_saturated_skips")
+        return ready + [node for node in live if node not in ready]
+
+    async def forward(self, request: Request, path: str) -> Response:
+        """
+        Sends the request to the first candidate that answers. Only failures
+        before the request went out (refused connection, connect or pool
+        timeout) fail over to the next replica. Once the replica may have the
+        request, a resend could run the same generation twice, so a read
+        timeout answers 504 and any other transport error (reset, dropped
+        mid-request) marks the replica down and answers 502.
+        If the client disconnects first, the upstream request is cancelled so
+        the replica sees the disconnect too and stops generating.
+        """
+        body = await request.body()
+        key = await routing_key(path, body, settings.proxy_routing_key)
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS}
+        metrics.increment("proxy_requests")
+
+        candidates = self.candidates(key)
+        for attempt, node in enumerate(candidates):
+            state = self.states[node]
+            state.inflight += 1
+            send = asyncio.create_task(self.client.request(
+                request.method, f"{node}{path}", params=request.query_params, content=body, headers=headers
+            ))
+            try:
+                upstream = await self._unless_disconnected(request, send)
+            except httpx.ReadTimeout:
+                logger.warning(f"Replica {node} timed out, not retrying")
+                metrics.increment("proxy_timeouts")
+                return ORJSONResponse({"detail": "Replica timed out"}, status_code=504)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                logger.warning(f"Replica {node} unreachable ({e!r}), failing over")
+                self._mark_down(node)
+                continue
+            except httpx.PoolTimeout:
+                logger.warning(f"No free connection to replica {node}, failing over")
+                continue
+            except httpx.TransportError as e:
+                logger.warning(f"Replica {node} failed mid-request ({e!r}), not retrying")
+                self._mark_down(node)
+                metrics.increment("proxy_upstream_errors")
+                return ORJSONResponse({"detail": "Replica failed"}, status_code=502)
+            finally:
+                send.cancel()
+                state.inflight -= 1
+
+            if upstream is None:
+                logger.info(f"Client disconnected, cancelled request to {node}")
+                metrics.increment("proxy_client_disconnects")
+                # Nobody reads this; 499 mirrors the replicas' "client closed request"
+                return ORJSONResponse({"detail": "Client closed request"}, status_code=499)
+
+            if upstream.status_code == 503 and attempt < len(candidates) - 1:
+                # Replica up but not serving (e.g. model not loaded)
+                logger.warning(f"Replica {node} returned 503, failing over")
+                self._mark_down(node)
+                continue
+            if attempt:
+                metrics.increment("proxy_failovers")
+            response_headers = {k: v for k, v in upstream.headers.items() if k.lower() not in _SKIP_RESPONSE_HEADERS}
+            response_headers["X-Replica"] = node
+            return Response(content=upstream.content, status_code=upstream.status_code, headers=response_headers)
+
+        metrics.increment("proxy_unavailable")
+        return ORJSONResponse({"detail": "No replica available"}, status_code=503)
+
+    async def _unless_disconnected(self, request: Request, send: asyncio.Task) -> Optional[httpx.Response]:
+        """The upstream response, or None once the client has gone away (`send` is then cancelled)."""
+        while True:
+            done, _ = await asyncio.wait({send}, timeout=settings.disconnect_poll_interval_seconds)
+            if done:
+                return send.result()
+            if await request.is_disconnected():
+                send.cancel()
+                await asyncio.wait({send})
+                return None
+
+    def _mark_down(self, node: str):
+        self.states[node].down_until = time.monotonic() + self.cooldown_seconds
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        return {
+            "routing_key": settings.proxy_routing_key,
+            "replicas": [
+                {"url": node, "inflight": state.inflight, "up": state.down_until <= now}
+                for node, state in self.states.items()
+            ],
+            "metrics": {k: v for k, v in metrics.snapshot().items() if k.startswith("proxy_")},
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.affinity = AffinityRouter(settings.proxy_replicas)
+    logger.info(f"Proxy: routing on {settings.proxy_routing_key} across {len(settings.proxy_replicas)} replicas")
+    yield
+    await app.state.affinity.aclose()
+    executor.shutdown_pool()
+
+app = FastAPI(
+    title="Classroom Feedback AI Proxy",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+@app.get("/proxy/status")
+async def proxy_status(request: Request):
+    return request.app.state.affinity.status()
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"], include_in_schema=False)
+async def proxy_endpoint(path: str, request: Request):
+    return await request.app.state.affinity.forward(request, f"/{path}")
@@ -1,61 +1,90 @@
 import hashlib
-import json
-from collections import OrderedDict
-from typing import Any, Optional
+from collections import Counter, OrderedDict
+from typing import Any, Iterable, Optional
 import time
 from app.config import settings
 
+# Item hashes are summed modulo 2**128, so the combined value is independent of
+# item order but still sensitive to duplicates (unlike XOR, where pairs cancel).
+_DIGEST_SIZE = 16
+_MODULUS = 1 << (_DIGEST_SIZE * 8)
+
+def _item_hash(value: str, person: bytes) -> int:
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=_DIGEST_SIZE, person=person).digest()
+    return int.from_bytes(digest, "little")
+
+def normalize_for_key(text: str) -> str:
+    """Collapses whitespace and case so trivially different entries share a key."""
+    return " ".join(text.split()).casefold()
+
 class FeedbackCache:
     def __init__(self, maxsize: int = settings.cache_maxsize, ttl: int = settings.cache_ttl_seconds):
         self.cache = OrderedDict()
         self.maxsize = maxsize
         self.ttl = ttl
 
-    def _generate_key(self, feedback: list[str], poll_stats: Optional[dict]) -> str:
+    def make_key(
+        self,
+        feedback: Iterable[str],
+        poll_stats: Optional[dict],
+        normalized: bool = False
+    ) -> str:
         """
-        Generates a deterministic hash based on content.
+        Generates a deterministic, order-independent hash based on content.
+        Each item is hashed on its own with BLAKE2b and the hashes are combined
+        commutatively, so no sorting or intermediate document is needed.
+        Compute it once per request and pass it to get/set.
+
+        With normalized=True the feedback is expected to be the preprocessed
+        (redacted, NFKC-normalized) text; whitespace and case are folded too.
         """
-        # Sort feedback list to ensure order independence
-        sorted_feedback = sorted(feedback)
-        
-        # Canonicalize poll_stats
-        canonical_poll = None
+        feedback_acc = 0
+        count = 0
+        for item in feedback:
+            if normalized:
+                item = normalize_for_key(item)
+            feedback_acc = (feedback_acc + _item_hash(item, b"feedback")) % _MODULUS
+            count += 1
+
+        poll_acc = 0
         if poll_stats:
-            canonical_poll = {k: sorted(v) if isinstance(v, list) else v for k, v in sorted(poll_stats.items())}
-            
-        payload = {
-            "feedback": sorted_feedback,
-            "poll_stats": canonical_poll
-        }
-        
-        serialized = json.dumps(payload, sort_keys=True)
-        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+            for name, values in poll_stats.items():
+                # Likert values repeat heavily, so a sorted histogram is cheap
+                histogram = sorted(Counter(values if isinstance(values, list) else [values]).items())
+                canonical = f"{name}\x00{histogram!r}"
+                poll_acc = (poll_acc + _item_hash(canonical, b"poll")) % _MODULUS
 
-    def get(self, feedback: list[str], poll_stats: Optional[dict]) -> Optional[Any]:
-        key = self._generate_key(feedback, poll_stats)
+        header = b"n" if normalized else b"r"
+        combined = b"".join((
+            header,
+            count.to_bytes(4, "little"),
+            feedback_acc.to_bytes(_DIGEST_SIZE, "little"),
+            poll_acc.to_bytes(_DIGEST_SIZE, "little"),
+        ))
+        return hashlib.blake2b(combined, digest_size=_DIGEST_SIZE).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
         if key not in self.cache:
             return None
-            
+
         entry = self.cache[key]
         if time.time() > entry["expires_at"]:
             del self.cache[key]
             return None
-            
+
         # Move to end (MRU)
         self.cache.move_to_end(key)
         return entry["data"]
 
-    def set(self, feedback: list[str], poll_stats: Optional[dict], data: Any):
-        key = self._generate_key(feedback, poll_stats)
-        
+    def set(self, key: str, data: Any):
         if key in self.cache:
             self.cache.move_to_end(key)
-        
+
         self.cache[key] = {
             "data": data,
             "expires_at": time.time() + self.ttl
         }
-        
+
         if len(self.cache) > self.maxsize:
             self.cache.popitem(last=False)
 
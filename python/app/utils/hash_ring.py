@@ -0,0 +1,34 @@
+import bisect
+import hashlib
+from typing import Iterable, List, Tuple
+
+def _point(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes. Each node owns `vnodes` points,
+    so keys spread evenly and adding or removing a node only moves the keys
+    that node owns (about 1/N of them).
+    """
+    def __init__(self, nodes: Iterable[str], vnodes: int = 100):
+        self.nodes: List[str] = list(dict.fromkeys(nodes))
+        points: List[Tuple[int, str]] = sorted(
+            (_point(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def preference_list(self, key: str) -> List[str]:
+        """Every node once, in ring order from the key's owner: the owner first, then its failover successors."""
+        if not self._owners:
+            return []
+        start = bisect.bisect(self._hashes, _point(key))
+        ordered: List[str] = []
+        for i in range(len(self._owners)):
+            node = self._owners[(start + i) % len(self._owners)]
+            if node not in ordered:
+                ordered.append(node)
+                if len(ordered) == len(self.nodes):
+                    break
+        return ordered
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from typing import Dict, Union
+
+class _Summary:
+    __slots__ = ("count", "total", "minimum", "maximum")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+class ServiceMetrics:
+    """
+    Thread-safe in-process counters and value summaries, exposed via the
+    /metrics endpoint.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+        self._summaries: Dict[str, _Summary] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float):
+        """Records one observation (a latency, a score) for a count/sum/min/max summary."""
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = self._summaries[name] = _Summary()
+            summary.add(value)
+
+    def set_gauge(self, name: str, value: float):
+        """Records the latest value of a level (e.g. current event-loop lag)."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counters[name]
+
+    def snapshot(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            data: Dict[str, Union[int, float]] = dict(self._counters)
+            data.update(self._gauges)
+            for name, summary in self._summaries.items():
+                data[f"{name}_count"] = summary.count
+                data[f"{name}_sum"] = summary.total
+                data[f"{name}_min"] = summary.minimum
+                data[f"{name}_max"] = summary.maximum
+            return data
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+            self._gauges.clear()
+
+async def monitor_event_loop_lag(interval: float):
+    """
+    Sleeps for `interval` in a loop and records how late each wake-up is.
+    Anything blocking the event loop (sync CPU work in a coroutine) shows up
+    directly as lag.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag_ms = max(0.0, (time.perf_counter() - start - interval) * 1000)
+        metrics.set_gauge("event_loop_lag_ms", lag_ms)
+        metrics.observe("event_loop_lag_ms", lag_ms)
+
+# Singleton instance
+metrics = ServiceMetrics()
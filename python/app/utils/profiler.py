@@ -0,0 +1,243 @@
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# Hard limits so a profiling session stays cheap under load
+MAX_STACK_DEPTH = 64
+MIN_INTERVAL_MS = 5.0
+TRACEMALLOC_FRAMES = 16
+
+class ProfilerBusy(Exception):
+    """Raised when a profiling session is already running."""
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _fold(frame, thread_name: str) -> str:
+    """Collapses a frame chain into 'thread;outer;...;inner' (flamegraph folded format)."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+class StackSampler:
+    """
+    Statistical profiler: a daemon thread snapshots every other thread's stack
+    each `interval` seconds via sys._current_frames(). Overhead scales with the
+    sampling rate, not with the amount of code running.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.counts[_fold(frame, names.get(thread_id, str(thread_id)))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+@dataclass
+class _StageStats:
+    calls: int = 0
+    total_peak: int = 0
+    max_peak: int = 0
+
+@dataclass
+class _Session:
+    sampler: StackSampler
+    memory: bool
+    owns_tracemalloc: bool
+    started_at: float = field(default_factory=time.perf_counter)
+    stages: Dict[str, _StageStats] = field(default_factory=dict)
+
+@dataclass
+class _RequestWindow:
+    remaining: int
+    done: asyncio.Event
+    started: int = 0
+
+class ProfilerControl:
+    """
+    Runs at most one profiling session at a time, either for a fixed duration
+    or for the next K /analyze requests, optionally with tracemalloc.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session: Optional[_Session] = None
+        self._window: Optional[_RequestWindow] = None
+        self._interval = 0.01
+        self._memory = False
+
+    @property
+    def memory_active(self) -> bool:
+        session = self._session
+        return session is not None and session.memory
+
+    def _start(self, interval: float, memory: bool):
+        owns_tracemalloc = memory and not tracemalloc.is_tracing()
+        if owns_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        sampler = StackSampler(interval)
+        self._session = _Session(sampler=sampler, memory=memory, owns_tracemalloc=owns_tracemalloc)
+        sampler.start()
+
+    def _teardown(self):
+        """Stops whatever is still running (also on cancellation or error)."""
+        session, self._session = self._session, None
+        self._window = None
+        if session is not None:
+            session.sampler.stop()
+            if session.owns_tracemalloc:
+                tracemalloc.stop()
+
+    def _finish(self, mode: str, tracked_files: List[str], top_n: int, requests: Optional[int] = None) -> dict:
+        session = self._session
+        if session is None:
+            # Armed for requests, but none arrived before the timeout
+            self._teardown()
+            return {"mode": mode, "duration_seconds": 0.0, "interval_ms": self._interval * 1000,
+                    "samples": 0, "requests_profiled": 0, "folded": ""}
+        session.sampler.stop()
+        result = {
+            "mode": mode,
+            "duration_seconds": round(time.perf_counter() - session.started_at, 3),
+            "interval_ms": session.sampler.interval * 1000,
+            "samples": session.sampler.samples,
+            "requests_profiled": requests,
+            "folded": session.sampler.folded(),
+        }
+        if session.memory:
+            result["stage_allocations"] = [
+                {
+                    "stage": stage,
+                    "calls": stats.calls,
+                    "mean_peak_kib": round(stats.total_peak / stats.calls / 1024, 2),
+                    "max_peak_kib": round(stats.max_peak / 1024, 2),
+                }
+                for stage, stats in session.stages.items() if stats.calls
+            ]
+            result["top_allocations"] = _top_allocations(tracked_files, top_n)
+        self._teardown()
+        return result
+
+    async def profile_for(self, seconds: float, interval_ms: float, memory: bool,
+                          tracked_files: List[str], top_n: int = 10) -> dict:
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            self._start(max(interval_ms, MIN_INTERVAL_MS) / 1000, memory)
+            await asyncio.sleep(seconds)
+            return self._finish("duration", tracked_files, top_n)
+        finally:
+            self._teardown()
+            self._lock.release()
+
+    async def profile_requests(self, count: int, timeout: float, interval_ms: float, memory: bool,
+                               tracked_files: List[str], top_n: int = 10) -> dict:
+        """Arms the profiler; sampling starts with the first /analyze request to arrive."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            self._interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+            self._memory = memory
+            window = self._window = _RequestWindow(remaining=count, done=asyncio.Event())
+            try:
+                await asyncio.wait_for(window.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._window = None
+            return self._finish("requests", tracked_files, top_n, requests=count - window.remaining)
+        finally:
+            self._teardown()
+            self._lock.release()
+
+    # --- Hooks called by the /analyze route (cheap no-ops when not armed) ---
+
+    def on_request_start(self) -> bool:
+        window = self._window
+        if window is None or window.started >= window.remaining:
+            return False
+        window.started += 1
+        if self._session is None:
+            self._start(self._interval, self._memory)
+        return True
+
+    def on_request_end(self, tracked: bool):
+        window = self._window
+        if not tracked or window is None:
+            return
+        window.remaining -= 1
+        window.started -= 1
+        if window.remaining <= 0:
+            window.done.set()
+
+    def record_stage(self, stage: str, peak_bytes: int):
+        session = self._session
+        if session is None:
+            return
+        stats = session.stages.setdefault(stage, _StageStats())
+        stats.calls += 1
+        stats.total_peak += peak_bytes
+        stats.max_peak = max(stats.max_peak, peak_bytes)
+
+def _top_allocations(tracked_files: List[str], top_n: int) -> List[dict]:
+    """Largest live allocations whose traceback passes through a tracked module."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(True, path, all_frames=True) for path in tracked_files]
+    )
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kib": round(stat.size / 1024, 2),
+            "blocks": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:top_n]
+    ]
+
+# Singleton instance
+profiler = ProfilerControl()
+
+def allocation_probe(stage: str) -> Callable:
+    """
+    Records the tracemalloc peak of each call while a memory profiling session
+    is active. The peak is process-wide, so concurrent work inflates it
+    somewhat. Costs one attribute check otherwise.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not profiler.memory_active or not tracemalloc.is_tracing():
+                return fn(*args, **kwargs)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.record_stage(stage, tracemalloc.get_traced_memory()[1] - before)
+        return wrapper
+    return decorator
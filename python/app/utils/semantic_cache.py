@@ -0,0 +1,133 @@
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+
+_WORD_REGEX = re.compile(r"\w+")
+
+def _stable_hash(token: str) -> int:
+    # crc32 rather than hash(): must agree across processes and restarts
+    return zlib.crc32(token.encode("utf-8"))
+
+def embed_feedback(feedback: List[str], dim: int = settings.semantic_cache_dim) -> np.ndarray:
+    """
+    Embeds a feedback set as a signed, hashed bag of unigrams and bigrams with
+    sublinear term frequency, L2-normalized. Punctuation, case and whitespace
+    are ignored, so near-identical sets land close together.
+    """
+    indices: List[int] = []
+    signs: List[float] = []
+    for item in feedback:
+        words = _WORD_REGEX.findall(item.casefold())
+        tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for token in tokens:
+            h = _stable_hash(token)
+            indices.append(h % dim)
+            signs.append(1.0 if h & 0x80000000 else -1.0)
+
+    vector = np.zeros(dim, dtype=np.float32)
+    if indices:
+        np.add.at(vector, np.asarray(indices), np.asarray(signs, dtype=np.float32))
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+    return vector
+
+def poll_means(poll_stats: Optional[Dict[str, List[int]]]) -> Dict[str, float]:
+    if not poll_stats:
+        return {}
+    return {name: sum(values) / len(values) for name, values in poll_stats.items() if values}
+
+@dataclass
+class SemanticEntry:
+    data: bytes
+    confidence: str
+    poll_means: Dict[str, float]
+    expires_at: float
+
+class SemanticCache:
+    """
+    Approximate analysis cache: a brute-force cosine-similarity index over
+    feedback-set embeddings, held in a fixed-size NumPy matrix that is
+    overwritten FIFO once full. The matrix is allocated on the first set(),
+    so importing the module costs nothing while the feature is off.
+
+    A lookup only matches entries with the same confidence level and poll means
+    within `poll_tolerance`, since both feed into the analysis.
+    """
+    def __init__(
+        self,
+        maxsize: int = settings.semantic_cache_maxsize,
+        ttl: int = settings.cache_ttl_seconds,
+        threshold: float = settings.semantic_cache_threshold,
+        poll_tolerance: float = settings.semantic_cache_poll_tolerance,
+        dim: int = settings.semantic_cache_dim
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.poll_tolerance = poll_tolerance
+        self.dim = dim
+        self.vectors: Optional[np.ndarray] = None
+        self.entries: List[Optional[SemanticEntry]] = []
+        self._next_slot = 0
+
+    def _polls_match(self, a: Dict[str, float], b: Dict[str, float]) -> bool:
+        if a.keys() != b.keys():
+            return False
+        return all(abs(a[name] - b[name]) <= self.poll_tolerance for name in a)
+
+    def get(
+        self,
+        vector: np.ndarray,
+        confidence: str,
+        poll_stats: Optional[Dict[str, List[int]]]
+    ) -> Optional[Tuple[bytes, float]]:
+        """Returns (cached data, similarity) for the best match above threshold."""
+        if self.vectors is None:
+            return None
+        similarities = self.vectors @ vector
+        means = poll_means(poll_stats)
+        now = time.time()
+        # Best-first; stop at the first entry that passes the cheap checks
+        for slot in np.argsort(similarities)[::-1]:
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                return None
+            entry = self.entries[slot]
+            if entry is None:
+                continue
+            if now > entry.expires_at:
+                self.entries[slot] = None
+                self.vectors[slot] = 0.0
+                continue
+            if entry.confidence == confidence and self._polls_match(entry.poll_means, means):
+                return entry.data, similarity
+        return None
+
+    def set(
+        self,
+        vector: np.ndarray,
+        confidence: str,
+        poll_stats: Optional[Dict[str, List[int]]],
+        data: bytes
+    ):
+        if self.vectors is None:
+            self.vectors = np.zeros((self.maxsize, self.dim), dtype=np.float32)
+            self.entries = [None] * self.maxsize
+        slot = self._next_slot
+        self.vectors[slot] = vector
+        self.entries[slot] = SemanticEntry(
+            data=data,
+            confidence=confidence,
+            poll_means=poll_means(poll_stats),
+            expires_at=time.time() + self.ttl
+        )
+        self._next_slot = (slot + 1) % self.maxsize
+
+# Singleton instance
+semantic_cache = SemanticCache()
@@ -0,0 +1,155 @@
+"""
+Local multi-replica harness for the cache-affinity proxy.
+
+Starts N service replicas (mock engine) and the proxy as uvicorn
+subprocesses, replays sessions that are each re-submitted several times,
+and compares the replicas' combined cache hit rate when requests go
+through the proxy versus when they are sprayed across replicas at random.
+
+    python -m benchmarks.cluster --replicas 3 --sessions 50 --resubmits 4
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+import httpx
+from benchmarks.payloads import make_payload
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class LocalCluster:
+    """
+    Context manager running `replicas` copies of app.main and, optionally,
+    app.proxy in front of them. Replicas use the mock engine (MODEL_PATH
+    points nowhere) and keep CPU stages inline.
+    """
+    def __init__(self, replicas: int = 3, proxy: bool = True, routing_key: str = "session_id",
+                 env: Optional[Dict[str, str]] = None, startup_timeout: float = 30.0):
+        self.replica_count = replicas
+        self.with_proxy = proxy
+        self.routing_key = routing_key
+        self.env = env or {}
+        self.startup_timeout = startup_timeout
+        self.replica_urls: List[str] = []
+        self.proxy_url: Optional[str] = None
+        self._processes: Dict[str, subprocess.Popen] = {}
+
+    def _spawn(self, module: str, port: int, env: Dict[str, str]) -> str:
+        url = f"http://127.0.0.1:{port}"
+        self._processes[url] = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=PYTHON_DIR,
+            env={**os.environ, **env},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        return url
+
+    def _wait_ready(self, url: str, path: str):
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._processes[url].poll() is not None:
+                raise RuntimeError(f"{url} exited during startup")
+            try:
+                if httpx.get(f"{url}{path}", timeout=1).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError(f"{url} did not become ready")
+
+    def __enter__(self) -> "LocalCluster":
+        replica_env = {
+            "MODEL_PATH": os.path.join(PYTHON_DIR, "models", "missing"),
+            "DATABASE_PATH": os.path.join(PYTHON_DIR, "missing.db"),
+            "CPU_POOL_WORKERS": "0",
+            "LOG_LEVEL": "WARNING",
+            **self.env,
+        }
+        try:
+            self.replica_urls = [self._spawn("app.main", free_port(), replica_env) for _ in range(self.replica_count)]
+            if self.with_proxy:
+                self.proxy_url = self._spawn("app.proxy", free_port(), {
+                    "PROXY_REPLICAS": json.dumps(self.replica_urls),
+                    "PROXY_ROUTING_KEY": self.routing_key,
+                    "LOG_LEVEL": "WARNING",
+                })
+            for url in self.replica_urls:
+                self._wait_ready(url, "/api/v1/health")
+            if self.proxy_url:
+                self._wait_ready(self.proxy_url, "/proxy/status")
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def stop(self, url: str):
+        process = self._processes.pop(url)
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def __exit__(self, *exc):
+        for url in list(self._processes):
+            self.stop(url)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Summed cache hits/misses across live replicas."""
+        totals = {"cache_hits": 0, "cache_misses": 0}
+        for url in self.replica_urls:
+            if url in self._processes:
+                snapshot = httpx.get(f"{url}/api/v1/metrics", timeout=5).json()
+                for name in totals:
+                    totals[name] += snapshot.get(name, 0)
+        return totals
+
+def replay(cluster: LocalCluster, targets: List[str], sessions: int, resubmits: int, size: int, seed: int) -> float:
+    """Sends every session `resubmits` times in shuffled order; returns the hit rate over that replay."""
+    rng = random.Random(seed)
+    payloads = [make_payload(size, seed=seed * 100_000 + i, session_id=f"sess_{seed}_{i}") for i in range(sessions)]
+    order = [p for p in payloads for _ in range(resubmits)]
+    rng.shuffle(order)
+
+    before = cluster.cache_stats()
+    with httpx.Client(timeout=60) as client:
+        for payload in order:
+            response = client.post(f"{rng.choice(targets)}/api/v1/analyze", json=payload)
+            response.raise_for_status()
+    after = cluster.cache_stats()
+    hits = after["cache_hits"] - before["cache_hits"]
+    misses = after["cache_misses"] - before["cache_misses"]
+    return hits / (hits + misses) if hits + misses else 0.0
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--resubmits", type=int, default=4)
+    parser.add_argument("--size", type=int, default=20, help="Feedback items per payload")
+    parser.add_argument("--routing-key", choices=["session_id", "content"], default="session_id")
+    args = parser.parse_args(argv)
+
+    with LocalCluster(args.replicas, routing_key=args.routing_key) as cluster:
+        sprayed = replay(cluster, cluster.replica_urls, args.sessions, args.resubmits, args.size, seed=1)
+        routed = replay(cluster, [cluster.proxy_url], args.sessions, args.resubmits, args.size, seed=2)
+
+    best = 1 - 1 / args.resubmits
+    print(f"{args.replicas} replicas, {args.sessions} sessions x {args.resubmits} submissions")
+    print(f"random spray:    hit rate {sprayed:.2f}")
+    print(f"affinity proxy:  hit rate {routed:.2f} (single-node ceiling {best:.2f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import time
+from typing import Optional
+from app.core.cancellation import CancellationToken
+
+FAKE_OUTPUT = '''{
+  "sentiment_score": 0.72,
+  "themes": ["pacing", "clarity", "examples"],
+  "strengths": ["Clear explanations", "Good worked examples"],
+  "improvements": ["Slow down on new material", "More time for questions"],
+  "summary": "Students found the session clear overall. Several asked for a slower pace and more question time."
+}'''
+
+class FakeEngine:
+    """
+    Stand-in for Phi4MiniEngine that simulates inference cost without a model:
+    prefill time scales with prompt length, then a fixed number of decode steps.
+    Honours cancel_token between decode steps like the real engine.
+    """
+    def __init__(
+        self,
+        prefill_ms_per_token: float = 0.05,
+        decode_ms_per_token: float = 2.0,
+        output_tokens: int = 60,
+        chars_per_token: int = 4,
+        output: str = FAKE_OUTPUT
+    ):
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.decode_ms_per_token = decode_ms_per_token
+        self.output_tokens = output_tokens
+        self.chars_per_token = chars_per_token
+        self.output = output
+        self.calls = 0
+
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 1024,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> str:
+        self.calls += 1
+        prompt_tokens = len(prompt) // self.chars_per_token
+        time.sleep(prompt_tokens * self.prefill_ms_per_token / 1000)
+
+        for _ in range(min(self.output_tokens, max_tokens)):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            time.sleep(self.decode_ms_per_token / 1000)
+
+        return self.output
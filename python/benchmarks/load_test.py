@@ -0,0 +1,174 @@
+"""
+Load test for POST /api/v1/analyze at fixed concurrency levels.
+
+By default the app runs in-process (httpx ASGI transport) with a FakeEngine
+that simulates prefill/decode timings. Pass --url to drive a running server.
+
+    python -m benchmarks.load_test --concurrency 1 4 16 --requests 200
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+from benchmarks.fake_engine import FakeEngine
+from benchmarks.payloads import make_payload
+
+ANALYZE_PATH = "/api/v1/analyze"
+METRICS_PATH = "/api/v1/metrics"
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    # pct * n / 100 rather than pct / 100 * n: 0.99 * 100 is 99.00000000000001
+    rank = max(0, math.ceil(pct * len(sorted_values) / 100) - 1)
+    return sorted_values[rank]
+
+def build_workload(total: int, size: int, repeat_ratio: float, tag: str, seed: int) -> List[Dict[str, Any]]:
+    """
+    Builds `total` payloads of `size` items where roughly `repeat_ratio` of them
+    re-submit an earlier payload's content (under a new session id).
+    """
+    rng = random.Random(seed)
+    unique: List[Dict[str, Any]] = []
+    workload = []
+    for i in range(total):
+        if unique and rng.random() < repeat_ratio:
+            base = rng.choice(unique)
+        else:
+            base = make_payload(size, seed=rng.randrange(1 << 30))
+            # Salt with the level tag so levels never share cache entries
+            base["feedback"][0] = f"[{tag}] {base['feedback'][0]}"
+            unique.append(base)
+        workload.append({**base, "session_id": f"{tag}_{i}"})
+    return workload
+
+async def fetch_metrics(client: httpx.AsyncClient) -> Dict[str, int]:
+    response = await client.get(METRICS_PATH)
+    return response.json() if response.status_code == 200 else {}
+
+async def run_level(client: httpx.AsyncClient, workload: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(workload)
+
+    async def worker():
+        nonlocal errors
+        for payload in pending:
+            start = time.perf_counter()
+            response = await client.post(ANALYZE_PATH, json=payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    before = await fetch_metrics(client)
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    after = await fetch_metrics(client)
+
+    hits = after.get("cache_hits", 0) - before.get("cache_hits", 0)
+    misses = after.get("cache_misses", 0) - before.get("cache_misses", 0)
+    waits = after.get("single_flight_waits", 0) - before.get("single_flight_waits", 0)
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(workload),
+        "errors": errors,
+        "throughput_rps": len(workload) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "cache_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "single_flight_waits": waits,
+    }
+
+def make_client(url: Optional[str], engine: FakeEngine) -> httpx.AsyncClient:
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=300)
+    # In-process: the ASGI transport does not run lifespan, so install the engine directly
+    from app.main import app
+    app.state.engine = engine
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300)
+
+async def run(
+    concurrency_levels: List[int],
+    requests_per_level: int,
+    size: int,
+    repeat_ratio: float,
+    url: Optional[str] = None,
+    engine: Optional[FakeEngine] = None,
+    seed: int = 0
+) -> Dict[str, Any]:
+    engine = engine or FakeEngine()
+    levels = []
+    async with make_client(url, engine) as client:
+        for concurrency in concurrency_levels:
+            workload = build_workload(requests_per_level, size, repeat_ratio, f"c{concurrency}", seed + concurrency)
+            levels.append(await run_level(client, workload, concurrency))
+    return {
+        "config": {
+            "target": url or "in-process",
+            "payload_size": size,
+            "repeat_ratio": repeat_ratio,
+            "requests_per_level": requests_per_level,
+            "prefill_ms_per_token": None if url else engine.prefill_ms_per_token,
+            "decode_ms_per_token": None if url else engine.decode_ms_per_token,
+            "output_tokens": None if url else engine.output_tokens,
+        },
+        "levels": levels,
+    }
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"{'conc':>5}{'reqs':>7}{'err':>5}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'hit rate':>10}"
+    ]
+    for level in report["levels"]:
+        lines.append(
+            f"{level['concurrency']:>5}{level['requests']:>7}{level['errors']:>5}"
+            f"{level['throughput_rps']:>9.1f}{level['p50_ms']:>10.1f}{level['p95_ms']:>10.1f}"
+            f"{level['p99_ms']:>10.1f}{level['cache_hit_rate']:>10.2%}"
+        )
+    return "\n".join(lines)
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--size", type=int, default=100, help="Feedback items per request")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="Fraction of re-submitted payloads")
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.05)
+    parser.add_argument("--decode-ms-per-token", type=float, default=2.0)
+    parser.add_argument("--output-tokens", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for the in-process app")
+    args = parser.parse_args(argv)
+    for name in ("app", "httpx"):
+        logging.getLogger(name).setLevel(args.log_level)
+
+    engine = FakeEngine(
+        prefill_ms_per_token=args.prefill_ms_per_token,
+        decode_ms_per_token=args.decode_ms_per_token,
+        output_tokens=args.output_tokens,
+    )
+    report = asyncio.run(run(
+        args.concurrency, args.requests, args.size, args.repeat_ratio, args.url, engine, args.seed
+    ))
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
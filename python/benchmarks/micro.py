@@ -0,0 +1,122 @@
+"""
+Micro-benchmarks for the CPU-bound stages of the analyze path.
+
+    python -m benchmarks.micro --output bench_micro.json
+    python -m benchmarks.micro --compare bench_micro.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, Optional
+from app.api.schemas import FeedbackRequest
+from app.core import preprocessor, prompt_builder, response_parser
+from app.utils.cache import FeedbackCache
+from app.utils.ethical import redact_pii
+from benchmarks.payloads import PAYLOAD_SIZES, make_adversarial_outputs, make_model_output, make_payload
+
+def time_call(fn: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """Times fn with timeit, auto-scaling the loop count to at least min_time per repeat."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": statistics.median(runs) * 1e6,
+        "min_us": min(runs) * 1e6,
+        "loops": number,
+    }
+
+def build_cases(size: int) -> Dict[str, Callable[[], object]]:
+    payload = make_payload(size, seed=size)
+    request = FeedbackRequest(**payload)
+    preprocessed = preprocessor.preprocess(request)
+    model_output = make_model_output(size, seed=size)
+
+    cache = FeedbackCache(maxsize=1024, ttl=3600)
+    key = cache.make_key(request.feedback, request.poll_stats)
+    cache.set(key, b"cached")
+
+    def redact_all():
+        for item in request.feedback:
+            redact_pii(item)
+
+    def cache_roundtrip():
+        k = cache.make_key(request.feedback, request.poll_stats)
+        cache.get(k)
+        cache.set(k, b"cached")
+
+    cases = {
+        "preprocess": lambda: preprocessor.preprocess(request),
+        "redact_pii": redact_all,
+        "build_prompt": lambda: prompt_builder.build_prompt(preprocessed),
+        "extract_json": lambda: response_parser.extract_json(model_output),
+        "cache_make_key": lambda: cache.make_key(request.feedback, request.poll_stats),
+        "cache_roundtrip": cache_roundtrip,
+    }
+    # Adversarial outputs scale with payload size (~100 chars per item)
+    for name, text in make_adversarial_outputs(size * 100).items():
+        cases[f"extract_json_{name}"] = lambda text=text: response_parser.extract_json(text)
+    return cases
+
+def run(sizes=PAYLOAD_SIZES, repeat: int = 5, min_time: float = 0.05) -> Dict[str, object]:
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        for name, fn in build_cases(size).items():
+            results[f"{name}[{size}]"] = time_call(fn, repeat, min_time)
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+def compare(current: Dict[str, object], baseline: Dict[str, object]) -> str:
+    """Formats a per-benchmark median comparison; ratios > 1.0 are slower."""
+    lines = [f"{'benchmark':<44}{'baseline us':>14}{'current us':>14}{'ratio':>8}"]
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            lines.append(f"{name:<44}{'-':>14}{stats['median_us']:>14.1f}{'new':>8}")
+            continue
+        ratio = stats["median_us"] / base["median_us"]
+        lines.append(f"{name:<44}{base['median_us']:>14.1f}{stats['median_us']:>14.1f}{ratio:>8.2f}")
+    return "\n".join(lines)
+
+def format_results(report: Dict[str, object]) -> str:
+    lines = [f"{'benchmark':<44}{'median us':>14}{'min us':>14}"]
+    for name, stats in report["results"].items():
+        lines.append(f"{name:<44}{stats['median_us']:>14.1f}{stats['min_us']:>14.1f}")
+    return "\n".join(lines)
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(PAYLOAD_SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per repeat")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat, args.min_time)
+    print(format_results(report))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        print(compare(report, baseline))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
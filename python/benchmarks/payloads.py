@@ -0,0 +1,83 @@
+import random
+from typing import Any, Dict, List
+
+PAYLOAD_SIZES = (10, 100, 500)
+
+OPENERS = [
+    "The lecture on", "I really liked", "I was confused by", "Please spend more time on",
+    "The examples for", "Could we get slides about", "The pace during", "Great explanation of",
+]
+TOPICS = [
+    "recursion", "dynamic programming", "graph traversal", "sorting", "big O notation",
+    "hash tables", "pointers", "memory management", "concurrency", "networking",
+]
+CLOSERS = [
+    "was very clear.", "went too fast.", "needs more examples.", "was the best part.",
+    "was hard to follow.", "helped a lot!", "could use a recap.", "",
+]
+_PII = [
+    " Email me at student{n}@university.edu", " Call 555-{n:03d}-1234", "",
+]
+
+def make_feedback(size: int, seed: int = 0, duplicate_ratio: float = 0.1) -> List[str]:
+    """
+    Builds `size` synthetic feedback entries with some exact duplicates and
+    embedded emails/phone numbers, so redaction and dedup do real work.
+    """
+    rng = random.Random(seed)
+    items: List[str] = []
+    for n in range(size):
+        if items and rng.random() < duplicate_ratio:
+            items.append(rng.choice(items))
+            continue
+        text = f"{rng.choice(OPENERS)} {rng.choice(TOPICS)} {rng.choice(CLOSERS)}"
+        text += rng.choice(_PII).format(n=n % 1000)
+        items.append(text.strip())
+    return items
+
+def make_poll_stats(size: int, seed: int = 0) -> Dict[str, List[int]]:
+    rng = random.Random(seed)
+    return {
+        "understanding": [rng.randint(1, 5) for _ in range(size)],
+        "pace": [rng.randint(1, 5) for _ in range(size)],
+    }
+
+def make_payload(size: int, seed: int = 0, session_id: str = "bench") -> Dict[str, Any]:
+    return {
+        "session_id": session_id,
+        "feedback": make_feedback(size, seed),
+        "poll_stats": make_poll_stats(size, seed),
+    }
+
+def make_model_output(size: int, seed: int = 0) -> str:
+    """
+    A realistic messy model response (prose + fenced JSON) whose lists grow
+    with the payload size, for exercising response_parser.extract_json.
+    """
+    rng = random.Random(seed)
+    entries = max(1, size // 10)
+    strengths = ", ".join(f'"{rng.choice(OPENERS)} {rng.choice(TOPICS)}"' for _ in range(entries))
+    improvements = ", ".join(f'"More {{examples}} for {rng.choice(TOPICS)}"' for _ in range(entries))
+    return (
+        "Sure! Here is the analysis of the feedback you provided:\n\n```json\n"
+        '{"sentiment_score": 0.64, "themes": ["pacing", "clarity"], '
+        f'"strengths": [{strengths}], "improvements": [{improvements}], '
+        '"summary": "Mixed feedback overall."}\n```\n'
+        "Let me know if you need anything else."
+    )
+
+def make_adversarial_outputs(length: int) -> Dict[str, str]:
+    """
+    Pathological model outputs of roughly `length` characters: truncated or
+    unbalanced objects, runs of escapes, and many non-JSON brace spans.
+    """
+    valid = '{"sentiment_score": 0.5, "summary": "ok"}'
+    return {
+        "unclosed_braces": "{" * length,
+        "unterminated_escapes": '{"summary": "' + '\\"' * (length // 2),
+        "brace_placeholders": "{x} " * (length // 4) + valid,
+        "flat_unclosed": "{" + "a" * length,
+        "deep_nesting": "{" * (length // 2) + "}" * (length // 2),
+        "long_prose": "word " * (length // 5) + valid,
+        "quoted_braces": '{"summary": "' + "{}" * (length // 2) + '"}',
+    }
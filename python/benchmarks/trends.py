@@ -0,0 +1,150 @@
+"""
+Benchmark for the trends rollups against the naive per-session scan.
+
+Seeds a throwaway SQLite database with N sessions (with rollup triggers
+active), then times a trends query both ways for one classroom.
+
+    python -m benchmarks.trends --sessions 100000 --classrooms 50
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from app.core import trends
+from run_seed import SCHEMA_SQL
+
+_THEMES = ["pacing", "clarity", "examples", "engagement", "confusion", "slides", "homework", "labs"]
+_IMPROVEMENTS = ["slow down", "more examples", "more interaction", "explain basics first", "share slides"]
+
+def seed(path: str, sessions: int, classrooms: int, seed_value: int = 0) -> float:
+    """Seeds the database and returns the seconds spent inserting summaries."""
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQL)
+    trends.ensure_rollup_schema(conn)
+    conn.execute("INSERT INTO users VALUES ('bench_teacher', 'Bench', 'bench@example.edu', 'teacher')")
+    conn.executemany(
+        "INSERT INTO classrooms (id, name, created_by) VALUES (?, ?, 'bench_teacher')",
+        [(f"room_{c}", f"Room {c}") for c in range(classrooms)]
+    )
+
+    start_date = datetime(2020, 1, 1)
+    session_rows = []
+    summary_rows = []
+    for i in range(sessions):
+        session_id = f"sess_{i}"
+        started_at = start_date + timedelta(hours=rng.randrange(5 * 365 * 24))
+        session_rows.append((session_id, f"room_{i % classrooms}", started_at))
+        insights = {
+            "sentiment_score": round(rng.random(), 2),
+            "themes": rng.sample(_THEMES, 3),
+            "improvements": rng.sample(_IMPROVEMENTS, 2),
+        }
+        summary_rows.append((f"summ_{i}", session_id, "summary", json.dumps(insights)))
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO class_sessions (id, classroom_id, started_at) VALUES (?, ?, ?)", session_rows
+        )
+    insert_start = time.perf_counter()
+    with conn:
+        conn.executemany(
+            "INSERT INTO feedback_summaries (id, session_id, summary_text, insights) VALUES (?, ?, ?, ?)",
+            summary_rows
+        )
+    elapsed = time.perf_counter() - insert_start
+    conn.close()
+    return elapsed
+
+def naive_trends(conn: sqlite3.Connection, classroom_id: str, top_k: int = 5) -> Dict[str, Any]:
+    """What a dashboard had to do before rollups: load and decode every session's insights."""
+    rows = conn.execute(
+        """
+        SELECT s.started_at, f.insights FROM feedback_summaries f
+        JOIN class_sessions s ON s.id = f.session_id
+        WHERE s.classroom_id = ?
+        """,
+        (classroom_id,)
+    ).fetchall()
+    weeks: Dict[str, list] = {}
+    themes: Counter = Counter()
+    improvements: Counter = Counter()
+    for started_at, raw in rows:
+        insights = json.loads(raw)
+        day = datetime.fromisoformat(started_at).date()
+        week = (day - timedelta(days=day.weekday())).isoformat()
+        weeks.setdefault(week, []).append(insights["sentiment_score"])
+        themes.update({t.lower() for t in insights.get("themes", [])})
+        improvements.update({t.lower() for t in insights.get("improvements", [])})
+    return {
+        "weeks": {w: sum(v) / len(v) for w, v in sorted(weeks.items())},
+        "top_themes": themes.most_common(top_k),
+        "top_improvements": improvements.most_common(top_k),
+    }
+
+def time_query(fn, repeat: int) -> Dict[str, float]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(runs), "min_ms": min(runs)}
+
+def run(sessions: int, classrooms: int, repeat: int = 5, path: Optional[str] = None) -> Dict[str, Any]:
+    owns_path = path is None
+    if owns_path:
+        handle, path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        os.remove(path)
+    try:
+        insert_seconds = seed(path, sessions, classrooms)
+        conn = sqlite3.connect(path)
+        classroom_id = "room_0"
+        buckets = conn.execute(
+            "SELECT count(*) FROM classroom_week_sentiment WHERE classroom_id = ?", (classroom_id,)
+        ).fetchone()[0]
+        report = {
+            "sessions": sessions,
+            "classrooms": classrooms,
+            "sessions_per_classroom": sessions // classrooms,
+            "weekly_buckets": buckets,
+            "summary_insert_rows_per_s": sessions / insert_seconds,
+            "rollup_query": time_query(lambda: trends.get_trends(conn, classroom_id, weeks=52), repeat),
+            "naive_query": time_query(lambda: naive_trends(conn, classroom_id), repeat),
+        }
+        conn.close()
+        return report
+    finally:
+        if owns_path and os.path.exists(path):
+            os.remove(path)
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--classrooms", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="Keep the seeded database at this path")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.sessions, args.classrooms, args.repeat, args.db)
+    print(f"sessions: {report['sessions']} across {report['classrooms']} classrooms "
+          f"({report['weekly_buckets']} weekly buckets for room_0)")
+    print(f"summary inserts with triggers: {report['summary_insert_rows_per_s']:.0f} rows/s")
+    print(f"rollup query: {report['rollup_query']['median_ms']:.2f} ms median")
+    print(f"naive query:  {report['naive_query']['median_ms']:.2f} ms median")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+Synthetic large-scale workload: seeds a session database and writes matching
+/analyze payloads for replay.
+
+Feedback text mixes exact duplicates, near-duplicates, embedded emails and
+phone numbers, multilingual and NFKC-sensitive Unicode, and entries over the
+500-character drop limit, at configurable rates. Understanding levels follow
+a per-session Likert distribution. Rows are bulk-loaded with executemany in
+large transactions on a PRAGMA-tuned connection.
+
+    python -m benchmarks.workload seed --db workload.db --sessions 20000 --feedback-per-session 50 \\
+        --payloads replay.jsonl --payload-sessions 1000 --rate 20
+    python -m benchmarks.workload replay replay.jsonl --url http://127.0.0.1:8000 --speed 2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.core.trends import ensure_rollup_schema
+from benchmarks.fake_engine import FakeEngine
+from benchmarks.load_test import ANALYZE_PATH, fetch_metrics, make_client, percentile
+from benchmarks.payloads import CLOSERS, OPENERS, TOPICS
+from run_bulk_analysis import ensure_indexes
+from run_seed import SCHEMA_SQL
+
+# Bulk-load settings: durability is irrelevant for a throwaway benchmark database
+LOAD_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",  # 256 MiB
+)
+
+_MULTILINGUAL = [
+    "La clase fue muy útil, pero el ritmo fue rápido.",
+    "Die Übungen zur Rekursion waren großartig.",
+    "Le rythme était trop rapide à la fin du cours.",
+    "व्याख्यान बहुत अच्छा था, लेकिन उदाहरण कम थे।",
+    "讲解很清楚，但是速度太快了。",
+    "例がもっと欲しいです。ｽﾗｲﾄﾞも共有してください。",
+    "Объяснение было понятным, спасибо!",
+]
+# Compatibility characters that NFKC folds (ligatures, superscripts, circled digits, NBSP)
+_COMPAT = [
+    "The \ufb01nal example was \ufb02awless.",
+    "Why is it O(n\u00b2) and not O(n log n)?",
+    "Question \u2460 and \u2461 on the quiz were unclear.",
+    "Slide\u00a012 had a typo.",
+    "The cafe\u0301 analogy was great.",
+]
+_PII_FORMATS = [
+    "Email me at {user}@university.edu",
+    "my address is {user}.{n}@gmail.com if you want to follow up",
+    "call me at 555-{n:03d}-{m:04d}",
+    "text (555) {n:03d}-{m:04d} about the project",
+    "+1 555.{n:03d}.{m:04d}",
+]
+
+@dataclass
+class TextMix:
+    """Probabilities for each kind of feedback entry; the remainder is plain template text."""
+    duplicate: float = 0.15
+    near_duplicate: float = 0.15
+    pii: float = 0.08
+    unicode: float = 0.08
+    long: float = 0.02
+
+def _fullwidth(text: str) -> str:
+    return "".join(chr(ord(c) + 0xFEE0) if "!" <= c <= "~" else "　" if c == " " else c for c in text)
+
+def _perturb(text: str, rng: random.Random) -> str:
+    """A near-duplicate: same meaning, different bytes."""
+    choice = rng.randrange(5)
+    if choice == 0:
+        return text.upper() if rng.random() < 0.5 else text.lower()
+    if choice == 1:
+        return "  ".join(text.split(" ")) + " "
+    if choice == 2:
+        return text.rstrip(".!?") + rng.choice(["!!", "...", "?", ""])
+    if choice == 3 and len(text) > 4:
+        i = rng.randrange(len(text) - 1)
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    return rng.choice(["Honestly, ", "Also ", "tbh "]) + text[0].lower() + text[1:]
+
+class FeedbackGenerator:
+    def __init__(self, mix: TextMix, rng: random.Random):
+        self.mix = mix
+        self.rng = rng
+
+    def _template(self) -> str:
+        rng = self.rng
+        return f"{rng.choice(OPENERS)} {rng.choice(TOPICS)} {rng.choice(CLOSERS)}".strip()
+
+    def comment(self, earlier: List[str]) -> str:
+        """One entry; `earlier` is the session's entries so far (for duplicates)."""
+        rng, mix = self.rng, self.mix
+        roll = rng.random()
+        if earlier and roll < mix.duplicate:
+            return rng.choice(earlier)
+        roll -= mix.duplicate
+        if earlier and roll < mix.near_duplicate:
+            return _perturb(rng.choice(earlier), rng)
+        roll -= mix.near_duplicate
+        if roll < mix.pii:
+            pii = rng.choice(_PII_FORMATS).format(user=f"student{rng.randrange(10_000)}",
+                                                  n=rng.randrange(1000), m=rng.randrange(10_000))
+            return f"{self._template()} {pii}"
+        roll -= mix.pii
+        if roll < mix.unicode:
+            kind = rng.randrange(3)
+            if kind == 0:
+                return rng.choice(_MULTILINGUAL)
+            if kind == 1:
+                return rng.choice(_COMPAT)
+            return _fullwidth(self._template())
+        roll -= mix.unicode
+        if roll < mix.long:
+            # Over the 500-character limit: dropped by the sanity check
+            parts = [self._template() for _ in range(rng.randint(12, 40))]
+            return " ".join(parts)
+        return self._template()
+
+    def levels(self, count: int) -> List[int]:
+        """Likert 1-5 answers clustered around a per-session mean."""
+        mean = self.rng.uniform(1.8, 4.6)
+        return [min(5, max(1, round(self.rng.gauss(mean, 0.9)))) for _ in range(count)]
+
+def seed(
+    path: str,
+    sessions: int,
+    feedback_per_session: int = 50,
+    classrooms: int = 100,
+    students: int = 2000,
+    mix: Optional[TextMix] = None,
+    batch_rows: int = 50_000,
+    payload_sessions: int = 0,
+    seed_value: int = 0
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Creates (or extends) the database at `path`. Returns load stats and the
+    /analyze payloads of `payload_sessions` randomly chosen sessions, built
+    exactly as the bulk analyzer would read them back.
+
+    Session numbers continue after the sessions earlier runs with the same
+    `seed_value` left in the database, so re-running adds new sessions
+    instead of colliding; a fresh database is reproducible per seed.
+    """
+    conn = sqlite3.connect(path)
+    for pragma in LOAD_PRAGMAS:
+        conn.execute(pragma)
+    conn.executescript(SCHEMA_SQL)
+    ensure_rollup_schema(conn)
+    # GLOB, not LIKE: "_" must match literally
+    offset = conn.execute(
+        "SELECT count(*) FROM class_sessions WHERE id GLOB ?", (f"wl_sess_{seed_value}_*",)
+    ).fetchone()[0]
+    rng = random.Random(f"{seed_value}+{offset}" if offset else seed_value)
+    generator = FeedbackGenerator(mix or TextMix(), rng)
+
+    load_start = time.perf_counter()
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO users VALUES ('wl_teacher', 'Workload Teacher', 'teacher@example.edu', 'teacher')")
+        conn.executemany(
+            "INSERT OR IGNORE INTO users VALUES (?, ?, ?, 'student')",
+            ((f"wl_student_{i}", f"Student {i}", f"s{i}@example.edu") for i in range(students))
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO classrooms (id, name, created_by) VALUES (?, ?, 'wl_teacher')",
+            ((f"wl_room_{c}", f"Room {c}") for c in range(classrooms))
+        )
+
+    selected = set(rng.sample(range(sessions), min(payload_sessions, sessions)))
+    payloads: List[Dict[str, Any]] = []
+    session_rows: List[tuple] = []
+    feedback_rows: List[tuple] = []
+    feedback_total = 0
+    start_date = datetime(2024, 1, 1)
+
+    def flush():
+        with conn:
+            conn.executemany(
+                "INSERT INTO class_sessions (id, classroom_id, started_at, ended_at, status) VALUES (?, ?, ?, ?, 'ended')",
+                session_rows
+            )
+            conn.executemany(
+                "INSERT INTO post_class_feedback (id, session_id, user_id, understanding_level, comment, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                feedback_rows
+            )
+        session_rows.clear()
+        feedback_rows.clear()
+
+    for s in range(sessions):
+        session_id = f"wl_sess_{seed_value}_{offset + s}"
+        started_at = start_date + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+        ended_at = started_at + timedelta(minutes=50)
+        session_rows.append((session_id, f"wl_room_{s % classrooms}", started_at, ended_at))
+
+        count = max(1, int(rng.gauss(feedback_per_session, feedback_per_session / 4)))
+        comments: List[str] = []
+        for _ in range(count):
+            comments.append(generator.comment(comments))
+        levels = generator.levels(count)
+        for j, (comment, level) in enumerate(zip(comments, levels)):
+            feedback_rows.append((
+                f"wl_fb_{seed_value}_{offset + s}_{j}", session_id, f"wl_student_{rng.randrange(students)}",
+                level, comment, ended_at + timedelta(seconds=j)
+            ))
+        feedback_total += count
+
+        if s in selected:
+            payloads.append({
+                "session_id": session_id,
+                "feedback": comments[:settings.max_feedback_items],
+                "poll_stats": {"understanding": levels},
+            })
+        if len(feedback_rows) >= batch_rows:
+            flush()
+    flush()
+    load_seconds = time.perf_counter() - load_start
+
+    # Indexes are cheaper to build once after the load than to maintain row by row
+    index_start = time.perf_counter()
+    ensure_indexes(conn)
+    index_seconds = time.perf_counter() - index_start
+    conn.close()
+    return {
+        "sessions": sessions,
+        "feedback_rows": feedback_total,
+        "load_seconds": load_seconds,
+        "rows_per_s": feedback_total / load_seconds if load_seconds else 0.0,
+        "index_seconds": index_seconds,
+    }, payloads
+
+def build_replay(
+    payloads: List[Dict[str, Any]],
+    requests: int,
+    rate: float,
+    resubmit_rate: float = 0.3,
+    late_feedback_rate: float = 0.1,
+    seed_value: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Schedules `requests` /analyze calls with Poisson arrivals at `rate`/s.
+    A share of them re-submit an earlier session unchanged (cache hits), and
+    another share re-submit it with one late comment added (near-duplicates).
+    Empty when there are no payloads to draw from.
+    """
+    if not payloads:
+        return []
+    rng = random.Random(seed_value)
+    generator = FeedbackGenerator(TextMix(), rng)
+    fresh = iter(payloads)
+    sent: List[Dict[str, Any]] = []
+    schedule = []
+    at = 0.0
+    for _ in range(requests):
+        at += rng.expovariate(rate)
+        roll = rng.random()
+        payload = None
+        if sent and roll < resubmit_rate:
+            payload = rng.choice(sent)
+        elif sent and roll < resubmit_rate + late_feedback_rate:
+            base = rng.choice(sent)
+            if len(base["feedback"]) < settings.max_feedback_items:
+                payload = {**base, "feedback": base["feedback"] + [generator.comment(base["feedback"])]}
+        if payload is None:
+            payload = next(fresh, None) or rng.choice(sent or payloads)
+            sent.append(payload)
+        schedule.append({"at": round(at, 4), "payload": payload})
+    return schedule
+
+def write_jsonl(path: str, records: List[Dict[str, Any]]):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def read_jsonl(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def replay(
+    schedule: List[Dict[str, Any]],
+    url: Optional[str] = None,
+    speed: float = 1.0,
+    max_inflight: int = 256,
+    engine: Optional[FakeEngine] = None
+) -> Dict[str, Any]:
+    """
+    Open-loop replay: each request is sent at its scheduled time (divided by
+    `speed`) regardless of how earlier ones are doing, so queueing shows up
+    in the latencies. `send_lag` measures how far the client itself fell behind.
+    """
+    latencies: List[float] = []
+    send_lags: List[float] = []
+    errors = 0
+    slots = asyncio.Semaphore(max_inflight)
+
+    async with make_client(url, engine or FakeEngine()) as client:
+        async def send(record: Dict[str, Any], start: float):
+            nonlocal errors
+            await asyncio.sleep(max(0.0, start + record["at"] / speed - time.perf_counter()))
+            async with slots:
+                sent_at = time.perf_counter()
+                send_lags.append((sent_at - start - record["at"] / speed) * 1000)
+                response = await client.post(ANALYZE_PATH, json=record["payload"])
+                latencies.append((time.perf_counter() - sent_at) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        before = await fetch_metrics(client)
+        start = time.perf_counter()
+        await asyncio.gather(*(send(record, start) for record in schedule))
+        wall = time.perf_counter() - start
+        after = await fetch_metrics(client)
+
+    hits = after.get("cache_hits", 0) - before.get("cache_hits", 0)
+    misses = after.get("cache_misses", 0) - before.get("cache_misses", 0)
+    latencies.sort()
+    return {
+        "requests": len(schedule),
+        "errors": errors,
+        "throughput_rps": len(schedule) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_send_lag_ms": max(send_lags, default=0.0),
+        "cache_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_cmd = commands.add_parser("seed", help="Bulk-load a database and optionally write a replay file")
+    seed_cmd.add_argument("--db", default="workload.db")
+    seed_cmd.add_argument("--sessions", type=int, default=20_000)
+    seed_cmd.add_argument("--feedback-per-session", type=int, default=50)
+    seed_cmd.add_argument("--classrooms", type=int, default=100)
+    seed_cmd.add_argument("--students", type=int, default=2000)
+    seed_cmd.add_argument("--batch-rows", type=int, default=50_000, help="Feedback rows per transaction")
+    seed_cmd.add_argument("--seed", type=int, default=0)
+    defaults = TextMix()
+    for name in ("duplicate", "near_duplicate", "pii", "unicode", "long"):
+        seed_cmd.add_argument(f"--{name.replace('_', '-')}-rate", type=float, default=getattr(defaults, name))
+    seed_cmd.add_argument("--payloads", help="Write a replay schedule (JSON lines) to this path")
+    seed_cmd.add_argument("--payload-sessions", type=int, default=1000, help="Distinct sessions in the replay")
+    seed_cmd.add_argument("--requests", type=int, help="Replay length (default: 2x payload sessions)")
+    seed_cmd.add_argument("--rate", type=float, default=10.0, help="Mean replay arrival rate (requests/s)")
+    seed_cmd.add_argument("--resubmit-rate", type=float, default=0.3)
+    seed_cmd.add_argument("--late-feedback-rate", type=float, default=0.1)
+
+    replay_cmd = commands.add_parser("replay", help="Replay a schedule against /api/v1/analyze")
+    replay_cmd.add_argument("schedule")
+    replay_cmd.add_argument("--url", help="Target server (default: in-process app with a fake engine)")
+    replay_cmd.add_argument("--speed", type=float, default=1.0, help="Time compression factor")
+    replay_cmd.add_argument("--max-inflight", type=int, default=256)
+    replay_cmd.add_argument("--output", help="Write results JSON to this path")
+    replay_cmd.add_argument("--log-level", default="WARNING", help="Log level for the in-process app")
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        if args.payloads and args.payload_sessions < 1:
+            seed_cmd.error("--payload-sessions must be at least 1 with --payloads")
+        mix = TextMix(args.duplicate_rate, args.near_duplicate_rate, args.pii_rate, args.unicode_rate, args.long_rate)
+        payload_sessions = args.payload_sessions if args.payloads else 0
+        stats, payloads = seed(args.db, args.sessions, args.feedback_per_session, args.classrooms, args.students,
+                               mix, args.batch_rows, payload_sessions, args.seed)
+        print(f"{stats['feedback_rows']} feedback rows across {stats['sessions']} sessions in "
+              f"{stats['load_seconds']:.1f}s ({stats['rows_per_s']:.0f} rows/s), "
+              f"indexes {stats['index_seconds']:.1f}s -> {os.path.abspath(args.db)}")
+        if args.payloads:
+            schedule = build_replay(payloads, args.requests or 2 * len(payloads), args.rate,
+                                    args.resubmit_rate, args.late_feedback_rate, args.seed)
+            write_jsonl(args.payloads, schedule)
+            span = schedule[-1]["at"] if schedule else 0.0
+            print(f"{len(schedule)} scheduled requests over {span:.0f}s -> {args.payloads}")
+        return
+
+    for name in ("app", "httpx"):
+        logging.getLogger(name).setLevel(args.log_level)
+    report = asyncio.run(replay(read_jsonl(args.schedule), args.url, args.speed, args.max_inflight))
+    print(f"{report['requests']} requests, {report['errors']} errors, {report['throughput_rps']:.1f} rps")
+    print(f"latency p50 {report['p50_ms']:.1f} ms, p95 {report['p95_ms']:.1f} ms, p99 {report['p99_ms']:.1f} ms")
+    print(f"cache hit rate {report['cache_hit_rate']:.2%}, max send lag {report['max_send_lag_ms']:.1f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
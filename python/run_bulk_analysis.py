@@ -0,0 +1,355 @@
+"""
+Offline bulk analysis over the session database.
+
+Finds sessions whose summary is missing or older than their newest feedback,
+analyzes them with the local model and writes feedback_summaries in batched
+transactions. Progress is checkpointed after every batch, so an interrupted
+run resumes where it stopped.
+
+    python run_bulk_analysis.py --db database.db --concurrency 2 --batch-size 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+from app.config import settings
+from app.core import executor, pipeline
+from app.core.cancellation import CancellationToken, GenerationCancelled
+from app.core.executor import PreparedAnalysis
+from app.core.inference import Phi4MiniEngine
+from app.core.trends import ensure_rollup_schema
+
+logger = logging.getLogger("bulk_analysis")
+
+# The pending-session query probes both tables per session
+INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_post_class_feedback_session_created ON post_class_feedback(session_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_feedback_summaries_session_processed ON feedback_summaries(session_id, processed_at);
+"""
+
+# Sessions with at least one comment and no summary newer than their newest feedback
+_HAS_COMMENTS = """
+EXISTS (SELECT 1 FROM post_class_feedback p
+        WHERE p.session_id = s.id AND trim(coalesce(p.comment, '')) != '')
+"""
+_IS_STALE = """
+NOT EXISTS (SELECT 1 FROM feedback_summaries f
+            WHERE f.session_id = s.id
+              AND f.processed_at >= (SELECT max(p.created_at) FROM post_class_feedback p
+                                     WHERE p.session_id = s.id))
+"""
+
+def _pending_where(force: bool) -> str:
+    return f"s.id > ? AND {_HAS_COMMENTS}" + ("" if force else f" AND {_IS_STALE}")
+
+@dataclass
+class SessionWork:
+    session_id: str
+    feedback: List[str]
+    poll_stats: Optional[Dict[str, List[int]]]
+    read_at: str
+
+@dataclass
+class Checkpoint:
+    run_id: str
+    database: str
+    force: bool
+    last_session_id: str = ""
+    processed: int = 0
+    failed: List[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, path: str):
+        # Write-then-rename so a crash never leaves a torn checkpoint
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+        os.replace(tmp_path, path)
+
+def ensure_indexes(conn: sqlite3.Connection):
+    conn.executescript(INDEXES_SQL)
+
+def count_pending(conn: sqlite3.Connection, after: str, force: bool) -> int:
+    return conn.execute(f"SELECT count(*) FROM class_sessions s WHERE {_pending_where(force)}", (after,)).fetchone()[0]
+
+def iter_pending_sessions(
+    conn: sqlite3.Connection,
+    after: str,
+    force: bool,
+    page_size: int = 200,
+    max_items: int = settings.max_feedback_items
+) -> Iterator[SessionWork]:
+    """
+    Streams pending sessions in session-id order. SQLite has no server-side
+    cursors, so this pages by key (id > last seen): memory stays bounded by
+    the page, and no read transaction is held open while batches are written.
+    """
+    while True:
+        read_at = conn.execute("SELECT strftime('%Y-%m-%d %H:%M:%S', 'now')").fetchone()[0]
+        session_ids = [row[0] for row in conn.execute(
+            f"SELECT s.id FROM class_sessions s WHERE {_pending_where(force)} ORDER BY s.id LIMIT ?",
+            (after, page_size)
+        )]
+        if not session_ids:
+            return
+
+        rows: Dict[str, Tuple[List[str], List[int]]] = {sid: ([], []) for sid in session_ids}
+        placeholders = ",".join("?" * len(session_ids))
+        cursor = conn.execute(
+            f"""
+            SELECT session_id, comment, understanding_level FROM post_class_feedback
+            WHERE session_id IN ({placeholders})
+            ORDER BY session_id, created_at, id
+            """,
+            session_ids
+        )
+        for session_id, comment, level in cursor:
+            feedback, levels = rows[session_id]
+            if comment and comment.strip() and len(feedback) < max_items:
+                feedback.append(comment)
+            if level is not None:
+                levels.append(level)
+
+        for session_id in session_ids:
+            feedback, levels = rows[session_id]
+            yield SessionWork(
+                session_id=session_id,
+                feedback=feedback,
+                poll_stats={"understanding": levels} if levels else None,
+                read_at=read_at
+            )
+        after = session_ids[-1]
+
+def _format_eta(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{secs:02d}s" if hours else f"{minutes}m{secs:02d}s"
+
+class BulkAnalyzer:
+    """
+    Pipelines the bulk run:
+    - preprocessing and prompt building run in the CPU pool, up to `prefetch`
+      sessions ahead of inference;
+    - at most `concurrency` generations run at once;
+    - results are written `batch_size` at a time in one transaction, after
+      which the checkpoint advances to the highest session id below which
+      every session is written or recorded as failed.
+    """
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        engine: Any,
+        checkpoint: Checkpoint,
+        checkpoint_path: str,
+        concurrency: int = 1,
+        prefetch: int = 8,
+        batch_size: int = 50,
+        page_size: int = 200,
+        progress_interval: float = 5.0,
+        out: Callable[[str], None] = print
+    ):
+        self.conn = conn
+        self.engine = engine
+        self.checkpoint = checkpoint
+        self.checkpoint_path = checkpoint_path
+        self.concurrency = concurrency
+        self.prefetch = prefetch
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.progress_interval = progress_interval
+        self.out = out
+
+        self._rows: List[tuple] = []
+        self._dispatched: Deque[str] = deque()
+        self._finished: Set[str] = set()
+        self._tokens: Set[CancellationToken] = set()
+        self._completed = 0
+        self._failed = 0
+        self._total = 0
+        self._start = 0.0
+
+    async def run(self) -> Dict[str, Any]:
+        after = self.checkpoint.last_session_id
+        self._total = count_pending(self.conn, after, self.checkpoint.force)
+        self._start = time.perf_counter()
+        self.out(f"{self._total} sessions to analyze")
+
+        generation_slots = asyncio.Semaphore(self.concurrency)
+        window = asyncio.Semaphore(self.concurrency + self.prefetch)
+        tasks: Set[asyncio.Task] = set()
+        reporter = asyncio.create_task(self._report_periodically())
+        try:
+            for work in iter_pending_sessions(self.conn, after, self.checkpoint.force, self.page_size):
+                await window.acquire()
+                self._dispatched.append(work.session_id)
+                task = asyncio.create_task(self._process(work, generation_slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: window.release())
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            reporter.cancel()
+            # Interrupted: stop generations at their next token, keep what finished
+            for token in self._tokens:
+                token.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._flush()
+            self._report()
+        return {"completed": self._completed, "failed": self._failed, "total": self._total}
+
+    async def _prepare(self, work: SessionWork) -> PreparedAnalysis:
+        args = (work.session_id, work.feedback, work.poll_stats, None, False)
+        pool = executor.get_pool()
+        if pool is None:
+            return executor.prepare_analysis(*args)
+        return await asyncio.get_running_loop().run_in_executor(pool, executor.prepare_analysis, *args)
+
+    async def _process(self, work: SessionWork, generation_slots: asyncio.Semaphore):
+        start_time = time.perf_counter()
+        try:
+            prepared = await self._prepare(work)
+            async with generation_slots:
+                cancel_token = CancellationToken()
+                self._tokens.add(cancel_token)
+                try:
+                    result = await pipeline.infer_analysis(
+                        work.session_id, prepared, self.engine, cancel_token, start_time
+                    )
+                finally:
+                    self._tokens.discard(cancel_token)
+        except (asyncio.CancelledError, GenerationCancelled):
+            # Not finished: stays behind the checkpoint and is retried on resume
+            raise
+        except Exception as e:
+            logger.error(f"Session {work.session_id} failed: {e}")
+            self.checkpoint.failed.append(work.session_id)
+            self._failed += 1
+            self._finished.add(work.session_id)
+            return
+
+        insights = result.model_dump(include={"sentiment_score", "themes", "strengths", "improvements", "confidence"})
+        self._rows.append((
+            f"summ_{uuid.uuid4().hex}",
+            work.session_id,
+            result.summary,
+            json.dumps(insights),
+            work.read_at,
+            self.checkpoint.run_id
+        ))
+        self._finished.add(work.session_id)
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """Writes buffered summaries in one transaction, then advances the checkpoint."""
+        rows, self._rows = self._rows, []
+        if rows:
+            with self.conn:
+                # Replace stale summaries; the trend rollup triggers see both sides
+                self.conn.executemany("DELETE FROM feedback_summaries WHERE session_id = ?", [(row[1],) for row in rows])
+                self.conn.executemany(
+                    "INSERT INTO feedback_summaries (id, session_id, summary_text, insights, processed_at, job_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            self._completed += len(rows)
+            self.checkpoint.processed += len(rows)
+
+        while self._dispatched and self._dispatched[0] in self._finished:
+            session_id = self._dispatched.popleft()
+            self._finished.discard(session_id)
+            self.checkpoint.last_session_id = session_id
+        self.checkpoint.save(self.checkpoint_path)
+
+    def _report(self):
+        done = self._completed + self._failed + len(self._rows)
+        elapsed = time.perf_counter() - self._start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self._total - done, 0)
+        eta = _format_eta(remaining / rate) if rate > 0 else "--"
+        self.out(f"[{done}/{self._total}] {rate:.2f} sessions/s | failed {self._failed} | "
+                 f"elapsed {_format_eta(elapsed)} | ETA {eta}")
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self._report()
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=settings.database_path)
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent generations")
+    parser.add_argument("--prefetch", type=int, default=8, help="Sessions preprocessed ahead of inference")
+    parser.add_argument("--workers", type=int, default=settings.cpu_pool_workers,
+                        help="Preprocessing processes (0 = inline)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Summaries per write transaction")
+    parser.add_argument("--page-size", type=int, default=200, help="Sessions read per query")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <db>.bulk-checkpoint.json)")
+    parser.add_argument("--reset", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--force", action="store_true", help="Re-analyze sessions with an up-to-date summary")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        sys.exit(f"Database {args.db} not found")
+    checkpoint_path = args.checkpoint or f"{args.db}.bulk-checkpoint.json"
+    checkpoint = None if args.reset else Checkpoint.load(checkpoint_path)
+    if checkpoint is not None:
+        if checkpoint.database != os.path.abspath(args.db) or checkpoint.force != args.force:
+            sys.exit(f"{checkpoint_path} belongs to another run; pass --reset to start over")
+        print(f"Resuming run {checkpoint.run_id} after session {checkpoint.last_session_id!r} "
+              f"({checkpoint.processed} already written)")
+    else:
+        checkpoint = Checkpoint(run_id=f"bulk_{uuid.uuid4().hex[:12]}", database=os.path.abspath(args.db), force=args.force)
+
+    engine = Phi4MiniEngine(settings.model_path)
+    settings.cpu_pool_workers = args.workers
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_indexes(conn)
+    ensure_rollup_schema(conn)
+    analyzer = BulkAnalyzer(
+        conn, engine, checkpoint, checkpoint_path,
+        concurrency=args.concurrency,
+        prefetch=args.prefetch,
+        batch_size=args.batch_size,
+        page_size=args.page_size,
+        progress_interval=args.progress_interval
+    )
+    try:
+        summary = asyncio.run(analyzer.run())
+    except KeyboardInterrupt:
+        print(f"Interrupted; progress saved to {checkpoint_path}")
+        return
+    finally:
+        executor.shutdown_pool()
+        conn.close()
+
+    print(f"Done: {summary['completed']} written, {summary['failed']} failed")
+    if checkpoint.failed:
+        # Still pending in the database, so the next run picks them up again
+        print(f"Failed sessions: {', '.join(checkpoint.failed[:20])}")
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
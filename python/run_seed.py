@@ -6,9 +6,52 @@ import os
 import json
 import random
 from datetime import datetime, timedelta
+from app.core.trends import ensure_rollup_schema
 
 DB_FILE = "database.db"
 
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classrooms (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    created_by TEXT NOT NULL REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS class_sessions (
+    id TEXT PRIMARY KEY,
+    classroom_id TEXT NOT NULL REFERENCES classrooms(id),
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ended_at TIMESTAMP,
+    status TEXT DEFAULT 'active',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS post_class_feedback (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES class_sessions(id),
+    user_id TEXT NOT NULL REFERENCES users(id),
+    understanding_level INTEGER NOT NULL,
+    comment TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS feedback_summaries (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES class_sessions(id),
+    summary_text TEXT NOT NULL,
+    insights TEXT,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    job_id TEXT
+);
+"""
+
 def run_seed():
     if os.path.exists(DB_FILE):
         os.remove(DB_FILE)
@@ -18,47 +61,8 @@ def run_seed():
     cursor = conn.cursor()
 
     # 1. Create Tables
-    cursor.executescript("""
-    CREATE TABLE IF NOT EXISTS users (
-        id TEXT PRIMARY KEY,
-        name TEXT NOT NULL,
-        email TEXT NOT NULL,
-        role TEXT NOT NULL
-    );
-    CREATE TABLE IF NOT EXISTS classrooms (
-        id TEXT PRIMARY KEY,
-        name TEXT NOT NULL,
-        description TEXT,
-        created_by TEXT NOT NULL REFERENCES users(id),
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    CREATE TABLE IF NOT EXISTS class_sessions (
-        id TEXT PRIMARY KEY,
-        classroom_id TEXT NOT NULL REFERENCES classrooms(id),
-        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        ended_at TIMESTAMP,
-        status TEXT DEFAULT 'active',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    CREATE TABLE IF NOT EXISTS post_class_feedback (
-        id TEXT PRIMARY KEY,
-        session_id TEXT NOT NULL REFERENCES class_sessions(id),
-        user_id TEXT NOT NULL REFERENCES users(id),
-        understanding_level INTEGER NOT NULL,
-        comment TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    CREATE TABLE IF NOT EXISTS feedback_summaries (
-        id TEXT PRIMARY KEY,
-        session_id TEXT NOT NULL REFERENCES class_sessions(id),
-        summary_text TEXT NOT NULL,
-        insights TEXT,
-        processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        job_id TEXT
-    );
-    """)
+    cursor.executescript(SCHEMA_SQL)
+    ensure_rollup_schema(conn)
 
     # 2. Base Data
     print("Inserting base data...")
@@ -1,12 +1,14 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock
 from app.main import app
+from app.api.serialization import loads
 from app.core.inference import Phi4MiniEngine
 
 # Mock the engine for testing without the heavy model
 class MockPhi4MiniEngine:
-    def generate(self, prompt: str, max_tokens: int = 512) -> str:
+    def generate(self, prompt: str, max_tokens: int = 512, cancel_token=None) -> str:
         # Return a valid JSON string compliant with the schema
         return '''
         {
@@ -62,3 +64,39 @@ def test_analyze_endpoint_empty_feedback(client):
     }
     response = client.post("/api/v1/analyze", json=payload)
     assert response.status_code == 422
+
+def test_analyze_cache_hit_returns_serialized_body(client):
+    feedback = ["Cache me if you can.", "Second item.", "Third item."]
+    first = client.post("/api/v1/analyze", json={"session_id": "cache_a", "feedback": feedback})
+    # Same content in a different order must hit the cache
+    second = client.post("/api/v1/analyze", json={"session_id": "cache_b", "feedback": feedback[::-1]})
+    assert first.status_code == 200 and second.status_code == 200
+    assert second.headers["content-type"] == "application/json"
+    first_data, second_data = first.json(), second.json()
+    assert second_data["session_id"] == "cache_b"
+    assert list(second_data) == list(first_data)
+    for key in ("sentiment_score", "themes", "strengths", "improvements", "summary", "confidence"):
+        assert second_data[key] == first_data[key]
+
+def test_analyze_endpoint_malformed_json(client):
+    response = client.post(
+        "/api/v1/analyze",
+        content=b'{"session_id": "x", "feedback": [',
+        headers={"content-type": "application/json"}
+    )
+    assert response.status_code == 422
+
+@pytest.mark.parametrize("extra", [
+    '"poll_stats": {"understanding": [123456789012345678901234567890]}',
+    '"metadata": {"weight": NaN, "limit": Infinity}',
+])
+def test_analyze_accepts_what_stdlib_json_accepts(client, extra):
+    # Parsed with orjson, but input it rejects and stdlib json accepts still parses
+    body = '{"session_id": "compat", "feedback": ["Great class!"], ' + extra + '}'
+    response = client.post("/api/v1/analyze", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 200
+
+def test_request_json_matches_stdlib_json():
+    body = b'{"big": 123456789012345678901234567890, "max": 18446744073709551616, "f": 0.5, "n": [1, -2]}'
+    assert loads(body) == json.loads(body)
+    assert loads(body)["big"] == 123456789012345678901234567890
@@ -0,0 +1,77 @@
+import asyncio
+import sqlite3
+import unicodedata
+import pytest
+from benchmarks import load_test, micro, workload
+from benchmarks.fake_engine import FakeEngine
+
+def test_load_test_smoke():
+    engine = FakeEngine(prefill_ms_per_token=0.0, decode_ms_per_token=0.0, output_tokens=1)
+    report = asyncio.run(load_test.run([1, 2], requests_per_level=6, size=10, repeat_ratio=0.5, engine=engine))
+    assert [level["concurrency"] for level in report["levels"]] == [1, 2]
+    for level in report["levels"]:
+        assert level["errors"] == 0
+        assert level["p50_ms"] <= level["p95_ms"] <= level["p99_ms"]
+        assert 0.0 <= level["cache_hit_rate"] <= 1.0
+
+def test_percentile_is_nearest_rank():
+    hundred = [float(v) for v in range(1, 101)]
+    assert load_test.percentile(hundred, 99) == 99
+    assert load_test.percentile(hundred, 95) == 95
+    assert load_test.percentile(hundred, 100) == 100
+    assert load_test.percentile([float(v) for v in range(1, 11)], 50) == 5
+    assert load_test.percentile([7.0], 0) == 7.0
+    assert load_test.percentile([], 50) == 0.0
+
+def test_micro_smoke():
+    report = micro.run(sizes=[10], repeat=1, min_time=0.001)
+    assert "extract_json[10]" in report["results"]
+    assert "ratio" in micro.compare(report, report)
+
+def test_workload_seed_and_replay(tmp_path):
+    mix = workload.TextMix(duplicate=0.2, near_duplicate=0.2, pii=0.2, unicode=0.2, long=0.1)
+    db = str(tmp_path / "workload.db")
+    stats, payloads = workload.seed(db, sessions=30, feedback_per_session=20, classrooms=3, students=10,
+                                    mix=mix, batch_rows=100, payload_sessions=5)
+
+    conn = sqlite3.connect(db)
+    comments = [row[0] for row in conn.execute("SELECT comment FROM post_class_feedback")]
+    levels = {row[0] for row in conn.execute("SELECT DISTINCT understanding_level FROM post_class_feedback")}
+    conn.close()
+    assert len(comments) == stats["feedback_rows"]
+    assert levels <= {1, 2, 3, 4, 5}
+    assert any(len(c) > 500 for c in comments)
+    assert any("@" in c for c in comments)
+    assert any(unicodedata.normalize("NFKC", c) != c for c in comments)
+    assert len(set(comments)) < len(comments)
+
+    assert len(payloads) == 5
+    schedule = workload.build_replay(payloads, requests=12, rate=1000.0, resubmit_rate=0.5, seed_value=1)
+    assert [r["at"] for r in schedule] == sorted(r["at"] for r in schedule)
+    assert len({r["payload"]["session_id"] for r in schedule}) < len(schedule)
+
+    engine = FakeEngine(prefill_ms_per_token=0.0, decode_ms_per_token=0.0, output_tokens=1)
+    report = asyncio.run(workload.replay(schedule, speed=10.0, engine=engine))
+    assert report["requests"] == 12
+    assert report["errors"] == 0
+    assert report["cache_hit_rate"] > 0
+
+def test_workload_handles_empty_payloads(tmp_path, capsys):
+    assert workload.build_replay([], requests=10, rate=1.0) == []
+    out = str(tmp_path / "replay.jsonl")
+    workload.main(["seed", "--db", str(tmp_path / "empty.db"), "--sessions", "0", "--payloads", out])
+    assert "0 scheduled requests" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        workload.main(["seed", "--db", str(tmp_path / "w.db"), "--payloads", out, "--payload-sessions", "0"])
+
+def test_workload_seed_extends_existing_database(tmp_path):
+    db = str(tmp_path / "workload.db")
+    first, _ = workload.seed(db, sessions=5, feedback_per_session=4, classrooms=2, students=5)
+    second, _ = workload.seed(db, sessions=3, feedback_per_session=4, classrooms=2, students=5)
+
+    conn = sqlite3.connect(db)
+    sessions = conn.execute("SELECT count(*) FROM class_sessions").fetchone()[0]
+    feedback = conn.execute("SELECT count(*) FROM post_class_feedback").fetchone()[0]
+    conn.close()
+    assert sessions == 8
+    assert feedback == first["feedback_rows"] + second["feedback_rows"]
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import sqlite3
+import time
+import pytest
+from app.config import settings
+from app.core import trends
+from benchmarks.fake_engine import FAKE_OUTPUT
+from run_bulk_analysis import BulkAnalyzer, Checkpoint, count_pending, ensure_indexes, iter_pending_sessions
+from run_seed import SCHEMA_SQL
+
+SESSIONS = [
+    # session_id, summary processed_at (None = no summary), comments
+    ("s1", None, ["Great pacing", "Loved the demo"]),
+    ("s2", "2999-01-01 00:00:00", ["Up to date already"]),
+    ("s3", "2000-01-01 00:00:00", ["Summary predates this comment"]),
+    ("s4", None, [None, "  "]),
+    ("s5", None, ["Too fast", "More examples please"]),
+]
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cpu_pool_workers", 0)
+    conn = sqlite3.connect(tmp_path / "bulk.db")
+    conn.executescript(SCHEMA_SQL)
+    trends.ensure_rollup_schema(conn)
+    ensure_indexes(conn)
+    conn.execute("INSERT INTO users VALUES ('u1', 'Student', 'u1@example.edu', 'student')")
+    conn.execute("INSERT INTO classrooms (id, name, created_by) VALUES ('room1', 'Room 1', 'u1')")
+    for session_id, processed_at, comments in SESSIONS:
+        conn.execute("INSERT INTO class_sessions (id, classroom_id) VALUES (?, 'room1')", (session_id,))
+        for i, comment in enumerate(comments):
+            conn.execute(
+                "INSERT INTO post_class_feedback (id, session_id, user_id, understanding_level, comment) "
+                "VALUES (?, ?, 'u1', ?, ?)",
+                (f"{session_id}_{i}", session_id, 3 + i, comment)
+            )
+        if processed_at:
+            conn.execute(
+                "INSERT INTO feedback_summaries (id, session_id, summary_text, insights, processed_at) "
+                "VALUES (?, ?, 'old', '{\"sentiment_score\": 0.1}', ?)",
+                (f"old_{session_id}", session_id, processed_at)
+            )
+    conn.commit()
+    yield conn
+    conn.close()
+
+class GateEngine:
+    """Answers instantly for the first `block_after` calls, then blocks until cancelled."""
+    def __init__(self, block_after=None):
+        self.block_after = block_after
+        self.calls = 0
+
+    def generate(self, prompt, max_tokens=1024, cancel_token=None):
+        self.calls += 1
+        if self.block_after is not None and self.calls > self.block_after:
+            while True:
+                cancel_token.raise_if_cancelled()
+                time.sleep(0.005)
+        return FAKE_OUTPUT
+
+def make_analyzer(conn, engine, checkpoint, path, **kwargs):
+    return BulkAnalyzer(conn, engine, checkpoint, str(path), out=lambda line: None, **kwargs)
+
+def test_composite_indexes_exist_alongside_rollup_schema(conn):
+    # trends.ensure_rollup_schema runs first and owns the single-column index names
+    for name, columns in [
+        ("idx_post_class_feedback_session_created", ["session_id", "created_at"]),
+        ("idx_feedback_summaries_session_processed", ["session_id", "processed_at"]),
+    ]:
+        assert [row[2] for row in conn.execute(f"PRAGMA index_info({name})")] == columns
+
+def test_streams_only_missing_or_stale_sessions(conn):
+    pending = list(iter_pending_sessions(conn, "", force=False, page_size=2))
+    assert [work.session_id for work in pending] == ["s1", "s3", "s5"]
+    assert pending[0].feedback == ["Great pacing", "Loved the demo"]
+    assert pending[0].poll_stats == {"understanding": [3, 4]}
+    assert count_pending(conn, "", force=True) == 4
+
+def test_bulk_run_writes_summaries(conn, tmp_path):
+    checkpoint = Checkpoint(run_id="run1", database="bulk.db", force=False)
+    analyzer = make_analyzer(conn, GateEngine(), checkpoint, tmp_path / "ckpt.json", concurrency=2, batch_size=2)
+    summary = asyncio.run(analyzer.run())
+
+    assert summary == {"completed": 3, "failed": 0, "total": 3}
+    assert count_pending(conn, "", force=False) == 0
+    rows = dict(conn.execute("SELECT session_id, job_id FROM feedback_summaries"))
+    assert rows == {"s1": "run1", "s2": None, "s3": "run1", "s5": "run1"}
+    insights = json.loads(conn.execute("SELECT insights FROM feedback_summaries WHERE session_id = 's3'").fetchone()[0])
+    assert insights["sentiment_score"] == 0.72
+    # Rollups replaced the stale summary rather than adding to it
+    assert conn.execute("SELECT sum(session_count) FROM classroom_week_sentiment").fetchone()[0] == 4
+
+def test_interrupted_run_resumes_from_checkpoint(conn, tmp_path):
+    path = tmp_path / "ckpt.json"
+    engine = GateEngine(block_after=1)
+    checkpoint = Checkpoint(run_id="run1", database="bulk.db", force=False)
+    analyzer = make_analyzer(conn, engine, checkpoint, path, batch_size=1)
+
+    async def interrupt():
+        task = asyncio.create_task(analyzer.run())
+        while engine.calls < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(interrupt())
+    saved = Checkpoint.load(str(path))
+    assert saved.last_session_id == "s1"
+    assert saved.processed == 1
+
+    engine = GateEngine()
+    summary = asyncio.run(make_analyzer(conn, engine, saved, path).run())
+    assert summary["completed"] == 2
+    assert engine.calls == 2
+    assert Checkpoint.load(str(path)).last_session_id == "s5"
+    assert count_pending(conn, "", force=False) == 0
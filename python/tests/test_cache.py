@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from app.api.schemas import FeedbackRequest
+from app.core.pipeline import analyze_feedback
+from app.utils.cache import FeedbackCache
+from app.utils.metrics import metrics
+
+def test_key_is_order_independent():
+    cache = FeedbackCache()
+    polls = {"pace": [3, 4, 5], "clarity": [5, 5, 1]}
+    key = cache.make_key(["a", "b", "c"], polls)
+    assert key == cache.make_key(["c", "a", "b"], {"clarity": [1, 5, 5], "pace": [5, 3, 4]})
+
+def test_key_distinguishes_content():
+    cache = FeedbackCache()
+    key = cache.make_key(["a", "b"], None)
+    assert key != cache.make_key(["a", "b", "b"], None)  # duplicates count
+    assert key != cache.make_key(["a", "b"], {"pace": [3]})
+    assert key != cache.make_key(["ab"], None)
+    assert cache.make_key(["a"], {"pace": [1, 2]}) != cache.make_key(["a"], {"pace": [1, 1, 2]})
+
+def test_normalized_key_folds_whitespace_and_case():
+    cache = FeedbackCache()
+    key = cache.make_key(["Great  class", "too fast"], None, normalized=True)
+    assert key == cache.make_key(["great class ", "Too Fast"], None, normalized=True)
+    assert key != cache.make_key(["Great  class", "too fast"], None)
+
+def test_get_set_and_expiry():
+    cache = FeedbackCache(maxsize=2, ttl=60)
+    cache.set("k1", b"one")
+    cache.set("k2", b"two")
+    assert cache.get("k1") == b"one"
+    cache.set("k3", b"three")  # evicts LRU entry k2
+    assert cache.get("k2") is None
+    cache.cache["k1"]["expires_at"] = time.time() - 1
+    assert cache.get("k1") is None
+
+class CountingEngine:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, max_tokens: int = 512, cancel_token=None) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.05)
+        return '{"sentiment_score": 0.7, "themes": ["pace"], "summary": "ok"}'
+
+def test_single_flight_coalesces_concurrent_requests():
+    metrics.reset()
+    engine = CountingEngine()
+    feedback = ["Single flight item one", "Single flight item two"]
+
+    async def run():
+        requests = [FeedbackRequest(session_id=f"sf_{i}", feedback=feedback) for i in range(5)]
+        return await asyncio.gather(*(analyze_feedback(r, engine) for r in requests))
+
+    results = asyncio.run(run())
+    assert engine.calls == 1
+    assert metrics.get("single_flight_waits") == 4
+    # Followers are served the leader's cached result under their own session id
+    assert b'"session_id":"sf_3"' in results[3]
+
+class InvalidJsonEngine(CountingEngine):
+    def generate(self, prompt: str, max_tokens: int = 512, cancel_token=None) -> str:
+        super().generate(prompt, max_tokens, cancel_token)
+        return "no json here"
+
+def test_single_flight_shares_leader_failure():
+    metrics.reset()
+    engine = InvalidJsonEngine()
+    feedback = ["Single flight failure one", "Single flight failure two"]
+
+    async def run():
+        requests = [FeedbackRequest(session_id=f"sf_fail_{i}", feedback=feedback) for i in range(5)]
+        return await asyncio.gather(*(analyze_feedback(r, engine) for r in requests), return_exceptions=True)
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    # One leader with its single retry; waiters get the same error instead of retrying in turn
+    assert engine.calls == 2
+    assert all(isinstance(r, ValueError) for r in results)
+    assert time.perf_counter() - start < 0.5
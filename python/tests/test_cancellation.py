@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.api.schemas import FeedbackRequest
+from app.core.pipeline import analyze_feedback
+from app.core.cancellation import CancellationToken, GenerationCancelled
+from app.utils.metrics import metrics
+
+# Fake engine that "decodes" one token every few milliseconds and honours the token
+class SlowTokenEngine:
+    def __init__(self, num_tokens: int = 200, token_delay: float = 0.005):
+        self.num_tokens = num_tokens
+        self.token_delay = token_delay
+        self.tokens_generated = 0
+        self.finished = threading.Event()
+
+    def generate(self, prompt: str, max_tokens: int = 512, cancel_token=None) -> str:
+        try:
+            for _ in range(self.num_tokens):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                time.sleep(self.token_delay)
+                self.tokens_generated += 1
+            return '{"sentiment_score": 0.5, "summary": "ok"}'
+        finally:
+            self.finished.set()
+
+def make_request(tag: str) -> FeedbackRequest:
+    return FeedbackRequest(session_id=tag, feedback=[f"Unique feedback for {tag}"])
+
+def test_token_cancel_stops_generation():
+    metrics.reset()
+    engine = SlowTokenEngine()
+    token = CancellationToken()
+
+    async def run():
+        task = asyncio.create_task(analyze_feedback(make_request("cancel_token"), engine, token))
+        await asyncio.sleep(0.05)
+        token.cancel()
+        await task
+
+    with pytest.raises(GenerationCancelled):
+        asyncio.run(run())
+
+    assert engine.tokens_generated < engine.num_tokens
+    assert metrics.get("generations_cancelled") == 1
+
+def test_task_cancel_propagates_to_engine():
+    metrics.reset()
+    engine = SlowTokenEngine()
+
+    async def run():
+        task = asyncio.create_task(analyze_feedback(make_request("cancel_task"), engine))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run())
+
+    # The worker thread must stop on its own instead of running to completion
+    assert engine.finished.wait(timeout=1.0)
+    assert engine.tokens_generated < engine.num_tokens
+    assert metrics.get("generations_cancelled") == 1
@@ -0,0 +1,57 @@
+import asyncio
+import time
+import tracemalloc
+import pytest
+from app.config import settings
+from app.core import executor
+from app.utils.metrics import metrics, monitor_event_loop_lag
+from benchmarks.payloads import make_payload
+
+@pytest.fixture
+def offload_everything(monkeypatch):
+    monkeypatch.setattr(settings, "cpu_pool_workers", 1)
+    monkeypatch.setattr(settings, "cpu_offload_min_items", 1)
+    yield
+    executor.shutdown_pool()
+
+def test_offloaded_stages_match_inline(offload_everything):
+    metrics.reset()
+    payload = make_payload(50, seed=7)
+    args = (payload["session_id"], payload["feedback"], payload["poll_stats"], None, True)
+
+    inline = executor.prepare_analysis(*args)
+    offloaded = asyncio.run(executor.run_stage(len(payload["feedback"]), executor.prepare_analysis, *args))
+    key = asyncio.run(executor.run_stage(50, executor.compute_cache_key, payload["feedback"], payload["poll_stats"]))
+
+    assert offloaded.preprocessed == inline.preprocessed
+    assert offloaded.user_prompt == inline.user_prompt
+    assert (offloaded.semantic_vector == inline.semantic_vector).all()
+    assert key == executor.compute_cache_key(payload["feedback"], payload["poll_stats"])
+    assert metrics.get("cpu_stages_offloaded") == 2
+
+def test_workers_do_not_inherit_tracemalloc(offload_everything):
+    tracemalloc.start()
+    try:
+        # First use creates the pool while the parent is tracing
+        assert executor.get_pool().submit(tracemalloc.is_tracing).result(timeout=60) is False
+    finally:
+        tracemalloc.stop()
+
+def test_small_payloads_stay_inline(monkeypatch):
+    monkeypatch.setattr(settings, "cpu_offload_min_items", 100)
+    metrics.reset()
+    asyncio.run(executor.run_stage(10, executor.compute_cache_key, ["a"], None))
+    assert metrics.get("cpu_stages_offloaded") == 0
+
+def test_event_loop_lag_is_recorded():
+    metrics.reset()
+
+    async def run():
+        monitor = asyncio.create_task(monitor_event_loop_lag(0.01))
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # Block the loop
+        await asyncio.sleep(0.02)
+        monitor.cancel()
+
+    asyncio.run(run())
+    assert metrics.snapshot()["event_loop_lag_ms_max"] >= 50
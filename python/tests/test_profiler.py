@@ -0,0 +1,80 @@
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.utils.profiler import profiler
+from benchmarks.fake_engine import FakeEngine
+from benchmarks.payloads import make_payload
+
+TOKEN = "s3cret"
+HEADERS = {"X-Admin-Token": TOKEN}
+
+@pytest.fixture
+def admin_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", TOKEN)
+    # Keep every stage inline so the profiler can see it
+    monkeypatch.setattr(settings, "cpu_offload_min_items", 10_000)
+
+def test_admin_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "")
+    with TestClient(app) as client:
+        response = client.post("/api/v1/admin/profile/sample?seconds=0.1", headers=HEADERS)
+    assert response.status_code == 404
+
+def test_admin_rejects_wrong_token(admin_enabled):
+    with TestClient(app) as client:
+        assert client.post("/api/v1/admin/profile/sample?seconds=0.1").status_code == 403
+        wrong = client.post("/api/v1/admin/profile/sample?seconds=0.1", headers={"X-Admin-Token": "nope"})
+        assert wrong.status_code == 403
+
+def test_sample_for_duration_returns_folded_stacks(admin_enabled):
+    with TestClient(app) as client:
+        response = client.post("/api/v1/admin/profile/sample?seconds=0.2&interval_ms=5", headers=HEADERS)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["mode"] == "duration"
+        assert data["samples"] > 0
+        for line in data["folded"].splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0 and stack
+
+        text = client.post("/api/v1/admin/profile/sample?seconds=0.1&format=folded", headers=HEADERS)
+        assert text.headers["content-type"].startswith("text/plain")
+
+def test_profile_next_requests_with_memory(admin_enabled):
+    app.state.engine = FakeEngine(decode_ms_per_token=1.0)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            armed = asyncio.create_task(client.post(
+                "/api/v1/admin/profile/requests?count=3&timeout_seconds=20&interval_ms=5&memory=true",
+                headers=HEADERS
+            ))
+            while profiler._window is None:
+                await asyncio.sleep(0.01)
+            # A second session is refused while one is armed
+            busy = await client.post("/api/v1/admin/profile/sample?seconds=0.1", headers=HEADERS)
+            for i in range(4):
+                response = await client.post("/api/v1/analyze", json=make_payload(20, seed=900 + i, session_id=f"p{i}"))
+                assert response.status_code == 200
+            return busy, await armed
+
+    busy, response = asyncio.run(run())
+    assert busy.status_code == 409
+    assert response.status_code == 200
+    data = response.json()
+    assert data["mode"] == "requests"
+    assert data["requests_profiled"] == 3
+    assert data["samples"] > 0
+    stages = {s["stage"]: s for s in data["stage_allocations"]}
+    assert {"preprocess", "build_prompt", "extract_json"} <= set(stages)
+    assert stages["preprocess"]["calls"] == 3
+    assert all(site["size_kib"] >= 0 for site in data["top_allocations"])
+
+def test_requests_mode_times_out_cleanly(admin_enabled):
+    result = asyncio.run(profiler.profile_requests(5, 0.05, 10, True, [], 5))
+    assert result["requests_profiled"] == 0
+    assert profiler._window is None and profiler._session is None
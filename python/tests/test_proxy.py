@@ -0,0 +1,216 @@
+from collections import Counter
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+import httpx
+import orjson
+from starlette.requests import Request
+from app import proxy
+from app.config import settings
+from app.core import executor
+from app.proxy import AffinityRouter, routing_key
+from app.utils.cache import analysis_cache
+from app.utils.hash_ring import HashRing
+from benchmarks.cluster import LocalCluster
+from benchmarks.payloads import make_payload
+
+NODES = ["http://a", "http://b", "http://c"]
+
+def test_ring_spreads_keys_and_lists_every_node():
+    ring = HashRing(NODES)
+    owners = Counter(ring.preference_list(f"session_{i}")[0] for i in range(3000))
+    assert set(owners) == set(NODES)
+    assert min(owners.values()) > 700
+    assert sorted(ring.preference_list("anything")) == sorted(NODES)
+
+def test_removing_a_node_only_moves_its_keys():
+    before = HashRing(NODES)
+    after = HashRing(NODES[:2])
+    for i in range(1000):
+        key = f"session_{i}"
+        owner = before.preference_list(key)[0]
+        if owner != "http://c":
+            assert after.preference_list(key)[0] == owner
+        else:
+            # Its keys go to the next node on the ring: the failover target
+            assert after.preference_list(key)[0] == before.preference_list(key)[1]
+
+def key_of(path, body, mode):
+    return asyncio.run(routing_key(path, body, mode))
+
+def test_routing_key_modes():
+    payload = make_payload(5, seed=3, session_id="abc")
+    body = orjson.dumps(payload)
+    assert key_of("/api/v1/analyze", body, "session_id") == "abc"
+    assert key_of("/api/v1/analyze", body, "content") == analysis_cache.make_key(
+        payload["feedback"], payload["poll_stats"]
+    )
+    assert key_of("/api/v1/analyze", b"not json", "session_id") == "/api/v1/analyze"
+    assert key_of("/api/v1/trends/room1", b"", "session_id") == "/api/v1/trends/room1"
+
+def test_content_routing_follows_normalized_cache_keys(monkeypatch):
+    monkeypatch.setattr(settings, "cache_key_normalized", True)
+    payload = make_payload(5, seed=3, session_id="abc")
+    spaced = {**payload, "feedback": [f"  {item.upper()} " for item in payload["feedback"]]}
+    key = key_of("/api/v1/analyze", orjson.dumps(payload), "content")
+    assert key == executor.preprocess_and_key("abc", payload["feedback"], payload["poll_stats"])[1]
+    assert key_of("/api/v1/analyze", orjson.dumps(spaced), "content") == key
+
+def test_large_payload_is_keyed_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(settings, "proxy_routing_key", "content")
+    monkeypatch.setattr(settings, "cache_key_normalized", True)
+    monkeypatch.setattr(settings, "cpu_offload_min_items", 50)
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(executor, "get_pool", lambda: pool)
+    real_key = executor.compute_normalized_cache_key
+    def slow_key(session_id, feedback, poll_stats):
+        if len(feedback) >= settings.cpu_offload_min_items:
+            time.sleep(0.5)
+        return real_key(session_id, feedback, poll_stats)
+    monkeypatch.setattr(executor, "compute_normalized_cache_key", slow_key)
+
+    router = AffinityRouter(NODES)
+    router.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    proxy.app.state.affinity = router
+
+    async def run():
+        transport = httpx.ASGITransport(app=proxy.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+            large = asyncio.create_task(client.post("/api/v1/analyze", json=make_payload(500, seed=1)))
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            small = await client.post("/api/v1/analyze", json=make_payload(3, seed=2))
+            small_seconds = time.perf_counter() - started
+            assert not large.done()
+            return small, small_seconds, await large
+    try:
+        small, small_seconds, large = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert small.status_code == large.status_code == 200
+    assert small_seconds < 0.3
+
+def route_through(handler, key="sticky"):
+    """Sends one /analyze request through the proxy app to replicas served by `handler`."""
+    router = AffinityRouter(NODES)
+    router.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    proxy.app.state.affinity = router
+    owner = router.ring.preference_list(key)[0]
+
+    async def send():
+        transport = httpx.ASGITransport(app=proxy.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+            return await client.post("/api/v1/analyze", json=make_payload(3, seed=1, session_id=key))
+    return router, owner, asyncio.run(send())
+
+def test_unreachable_replica_fails_over():
+    calls = []
+    def handler(request):
+        node = f"http://{request.url.host}"
+        calls.append(node)
+        if len(calls) == 1:
+            raise httpx.ConnectError("Connection refused", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    router, owner, response = route_through(handler)
+    assert response.status_code == 200
+    assert calls[0] == owner and response.headers["x-replica"] == calls[1] != owner
+    assert [r["up"] for r in router.status()["replicas"] if r["url"] == owner] == [False]
+
+def test_replica_dropping_an_accepted_request_is_not_resent():
+    received = []
+    async def accept_then_drop(reader, writer):
+        received.append(await reader.readuntil(b"\r\n\r\n"))
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(accept_then_drop, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        router = AffinityRouter([f"http://127.0.0.1:{port}", "http://b", "http://c"])
+        # Any further attempt would reach this transport instead of the socket
+        resent = []
+        router.client = httpx.AsyncClient(mounts={
+            "http://b": httpx.MockTransport(lambda request: resent.append(request) or httpx.Response(200)),
+            "http://c": httpx.MockTransport(lambda request: resent.append(request) or httpx.Response(200)),
+        })
+        router.candidates = lambda key: router.ring.nodes
+        proxy.app.state.affinity = router
+        transport = httpx.ASGITransport(app=proxy.app)
+        async with server, httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+            response = await client.post("/api/v1/analyze", json=make_payload(3, seed=1))
+        return router, resent, response
+
+    router, resent, response = asyncio.run(run())
+    assert response.status_code == 502
+    assert len(received) == 1 and resent == []
+    assert [r["up"] for r in router.status()["replicas"]] == [False, True, True]
+
+def test_decoded_upstream_body_is_not_labelled_compressed():
+    body = orjson.dumps({"summary": "ok" * 500})
+    def handler(request):
+        return httpx.Response(200, content=gzip.compress(body),
+                              headers={"content-encoding": "gzip", "content-type": "application/json"})
+
+    router, owner, response = route_through(handler)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.content == body
+
+def test_read_timeout_is_not_resent():
+    calls = []
+    def handler(request):
+        calls.append(request.url.host)
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    router, owner, response = route_through(handler)
+    assert response.status_code == 504
+    assert len(calls) == 1
+    assert all(r["up"] for r in router.status()["replicas"])
+
+def test_client_disconnect_cancels_upstream_request(monkeypatch):
+    monkeypatch.setattr(settings, "disconnect_poll_interval_seconds", 0.01)
+    upstream_cancelled = asyncio.Event()
+    async def handler(request):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            upstream_cancelled.set()
+            raise
+
+    messages = [{"type": "http.request", "body": orjson.dumps(make_payload(3, seed=1)), "more_body": False}]
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/analyze", "query_string": b"", "headers": []}
+
+    async def run():
+        router = AffinityRouter(NODES)
+        router.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        response = await asyncio.wait_for(router.forward(Request(scope, receive), "/api/v1/analyze"), timeout=5)
+        return router, response
+    router, response = asyncio.run(run())
+    assert response.status_code == 499
+    assert upstream_cancelled.is_set()
+    assert all(r["inflight"] == 0 and r["up"] for r in router.status()["replicas"])
+
+def test_local_cluster_affinity_and_failover():
+    with LocalCluster(replicas=3) as cluster:
+        payload = make_payload(10, seed=11, session_id="sticky")
+        with httpx.Client(base_url=cluster.proxy_url, timeout=30) as client:
+            first = client.post("/api/v1/analyze", json=payload)
+            second = client.post("/api/v1/analyze", json=payload)
+            assert first.status_code == second.status_code == 200
+            owner = first.headers["x-replica"]
+            assert second.headers["x-replica"] == owner
+            assert cluster.cache_stats() == {"cache_hits": 1, "cache_misses": 1}
+
+            cluster.stop(owner)
+            failover = client.post("/api/v1/analyze", json=payload)
+            assert failover.status_code == 200
+            assert failover.headers["x-replica"] != owner
+            expected = HashRing(cluster.replica_urls).preference_list("sticky")[1]
+            assert failover.headers["x-replica"] == expected
+
+            status = client.get("/proxy/status").json()
+            assert status["metrics"]["proxy_failovers"] == 1
+            assert [r["up"] for r in status["replicas"] if r["url"] == owner] == [False]
@@ -0,0 +1,81 @@
+import json
+import random
+import string
+import time
+import pytest
+from app.core.response_parser import extract_json, parse_response
+from benchmarks.payloads import make_adversarial_outputs
+
+SAMPLE = {"sentiment_score": 0.6, "themes": ["pace"], "summary": "Fine."}
+
+@pytest.mark.parametrize("text", [
+    json.dumps(SAMPLE),
+    f"  {json.dumps(SAMPLE)}\n",
+    f"```json\n{json.dumps(SAMPLE, indent=2)}\n```",
+    f"Here is the analysis:\n{json.dumps(SAMPLE)}\nHope this helps!",
+    f"Use {{placeholders}} like this. {json.dumps(SAMPLE)}",
+])
+def test_extract_json_finds_object(text):
+    assert extract_json(text) == SAMPLE
+
+def test_extract_json_ignores_braces_inside_strings():
+    payload = {"summary": "Students wrote } and { and \\\" in comments", "themes": ["{a}"]}
+    assert extract_json(f"Result: {json.dumps(payload)} trailing }}") == payload
+
+@pytest.mark.parametrize("text", [
+    "",
+    "no json here",
+    '{"summary": "truncated',
+    '{"a": {"b": 1}',
+    "[1, 2, 3]",
+])
+def test_extract_json_returns_none(text):
+    assert extract_json(text) is None
+
+def test_extract_json_accepts_what_stdlib_json_accepts():
+    text = 'Result: {"sentiment_score": NaN, "count": 123456789012345678901234567890}'
+    parsed = extract_json(text)
+    assert parsed["sentiment_score"] != parsed["sentiment_score"]
+    assert parsed["count"] == 123456789012345678901234567890
+
+def test_parse_response_rejects_invalid_output():
+    with pytest.raises(ValueError):
+        parse_response("I cannot help with that.", "low", "s1")
+
+def _random_value(rng: random.Random, depth: int = 0):
+    kind = rng.randrange(6 if depth < 3 else 4)
+    if kind == 0:
+        return rng.randint(-1000, 1000)
+    if kind == 1:
+        return rng.random()
+    if kind == 2:
+        return "".join(rng.choice(string.printable + '{}"\\é漢') for _ in range(rng.randrange(12)))
+    if kind == 3:
+        return rng.choice([True, False, None])
+    if kind == 4:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{i}": _random_value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+def test_extract_json_fuzz_roundtrip():
+    rng = random.Random(1234)
+    prose_chars = string.ascii_letters + string.digits + " .,:;!?'\n`"
+    for _ in range(500):
+        obj = {f"key{i}": _random_value(rng) for i in range(rng.randrange(1, 5))}
+        prefix = "".join(rng.choice(prose_chars) for _ in range(rng.randrange(40)))
+        suffix = "".join(rng.choice(prose_chars + "{}") for _ in range(rng.randrange(40)))
+        encoded = json.dumps(obj, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2]))
+        assert extract_json(prefix + encoded + suffix) == obj
+
+def test_extract_json_fuzz_garbage_never_raises():
+    rng = random.Random(99)
+    alphabet = '{}[]":,\\ ab1\n'
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randrange(200)))
+        result = extract_json(text)
+        assert result is None or isinstance(result, dict)
+
+def test_extract_json_adversarial_inputs_are_fast():
+    for name, text in make_adversarial_outputs(50_000).items():
+        start = time.perf_counter()
+        extract_json(text)
+        assert time.perf_counter() - start < 0.5, name
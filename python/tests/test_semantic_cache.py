@@ -0,0 +1,77 @@
+import asyncio
+import orjson
+import pytest
+from app.api.schemas import FeedbackRequest
+from app.config import settings
+from app.core import pipeline
+from app.utils.metrics import metrics
+from app.utils.semantic_cache import SemanticCache, embed_feedback
+
+BASE = [
+    "The recursion examples were really clear",
+    "Please slow down when introducing new notation",
+    "More practice problems on base cases would help",
+    "Loved the live coding demo at the end",
+]
+
+def test_embedding_ignores_case_punctuation_and_whitespace():
+    variant = ["the  recursion examples were REALLY clear!!", *BASE[1:]]
+    similarity = float(embed_feedback(BASE) @ embed_feedback(variant))
+    assert similarity == pytest.approx(1.0)
+
+def test_embedding_separates_unrelated_sets():
+    other = ["Audio kept cutting out", "Room was too cold", "Slides were not shared"]
+    assert float(embed_feedback(BASE) @ embed_feedback(other)) < 0.3
+
+def test_lookup_respects_threshold_confidence_and_polls():
+    cache = SemanticCache(maxsize=4, threshold=0.85)
+    cache.set(embed_feedback(BASE), "medium", {"pace": [3, 4]}, b"cached")
+
+    near = embed_feedback(BASE[:3] + ["Loved the live coding demo at the very end"])
+    data, similarity = cache.get(near, "medium", {"pace": [4, 3]})
+    assert data == b"cached" and similarity >= 0.85
+
+    assert cache.get(near, "high", {"pace": [3, 4]}) is None
+    assert cache.get(near, "medium", {"pace": [1, 1]}) is None
+    assert cache.get(embed_feedback(["Something else entirely"]), "medium", {"pace": [3, 4]}) is None
+
+def test_matrix_is_allocated_on_first_set():
+    cache = SemanticCache(maxsize=4)
+    assert cache.vectors is None
+    assert cache.get(embed_feedback(BASE), "medium", None) is None
+    cache.set(embed_feedback(BASE), "medium", None, b"cached")
+    assert cache.vectors.shape == (4, cache.dim)
+
+def test_lookup_evicts_fifo_when_full():
+    cache = SemanticCache(maxsize=2, threshold=0.9)
+    for i in range(3):
+        cache.set(embed_feedback([f"distinct feedback number {i}"]), "low", None, str(i).encode())
+    assert cache.get(embed_feedback(["distinct feedback number 0"]), "low", None) is None
+    assert cache.get(embed_feedback(["distinct feedback number 2"]), "low", None)[0] == b"2"
+
+class CountingEngine:
+    calls = 0
+
+    def generate(self, prompt: str, max_tokens: int = 512, cancel_token=None) -> str:
+        self.calls += 1
+        return '{"sentiment_score": 0.8, "themes": ["recursion"], "summary": "Clear session."}'
+
+def test_pipeline_serves_near_duplicate_as_approximate(monkeypatch):
+    monkeypatch.setattr(settings, "semantic_cache_enabled", True)
+    monkeypatch.setattr(pipeline, "semantic_cache", SemanticCache(maxsize=8, threshold=0.85))
+    metrics.reset()
+    engine = CountingEngine()
+
+    first = asyncio.run(pipeline.analyze_feedback(FeedbackRequest(session_id="sem_1", feedback=BASE), engine))
+    resubmitted = [*BASE[:3], "Loved the live coding demo at the end!"]
+    second = asyncio.run(pipeline.analyze_feedback(FeedbackRequest(session_id="sem_2", feedback=resubmitted), engine))
+
+    assert engine.calls == 1
+    assert first.approximate is False
+    body = orjson.loads(second)
+    assert body["approximate"] is True
+    assert body["session_id"] == "sem_2"
+    assert body["summary"] == first.summary
+    snapshot = metrics.snapshot()
+    assert snapshot["semantic_cache_hits"] == 1
+    assert snapshot["semantic_cache_similarity_count"] == 1
@@ -0,0 +1,115 @@
+import asyncio
+import re
+from app.api.schemas import FeedbackRequest
+from app.core import pipeline, prompt_builder
+from app.core.preprocessor import preprocess_items
+from app.core.tokenization import PromptTokenizer
+from app.utils.cache import analysis_cache
+from app.utils.metrics import metrics
+
+SPECIALS = [prompt_builder.SYS_START, prompt_builder.SYS_END, prompt_builder.USR_START, prompt_builder.ASST_START]
+_SPECIAL_RE = re.compile("(" + "|".join(re.escape(s) for s in SPECIALS) + ")")
+
+class CharTokenizer:
+    """Special markers become one token each, everything else one token per character."""
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        tokens = []
+        for piece in _SPECIAL_RE.split(text):
+            if piece in SPECIALS:
+                tokens.append(-1 - SPECIALS.index(piece))
+            else:
+                tokens.extend(ord(c) for c in piece)
+        return tokens
+
+    def decode(self, tokens):
+        return "".join(SPECIALS[-1 - t] if t < 0 else chr(t) for t in tokens)
+
+class SentencePieceLikeTokenizer(CharTokenizer):
+    """Like SentencePiece/Llama tokenizers: a BOS token and a leading-space marker on every call."""
+    BOS = -100
+
+    def encode(self, text):
+        return [self.BOS] + super().encode(" " + text)
+
+def make_parts(feedback, session_id="s1"):
+    return prompt_builder.build_prompt_parts(preprocess_items(session_id, feedback, {"understanding": [3, 4, 5]}))
+
+def test_token_assembly_matches_whole_string_encoding():
+    tokenizer = CharTokenizer()
+    prompt_tokenizer = PromptTokenizer(tokenizer.encode)
+    for feedback in (["Great pace.", "Too fast on slide 4!"], ["only one"]):
+        parts = make_parts(feedback)
+        for retry in (False, True):
+            expected = tokenizer.encode(prompt_builder.build_chat_prompt("SYSTEM", parts.render(), retry))
+            assert prompt_tokenizer.encode_chat("SYSTEM", parts, retry).tolist() == expected
+
+def test_tokenizer_with_per_call_prefix_encodes_whole_prompt():
+    tokenizer = SentencePieceLikeTokenizer()
+    prompt_tokenizer = PromptTokenizer(tokenizer.encode)
+    assert not prompt_tokenizer.piecewise
+    parts = make_parts(["Great pace.", "Too fast on slide 4!"])
+    for retry in (False, True):
+        expected = tokenizer.encode(prompt_builder.build_chat_prompt("SYSTEM", parts.render(), retry))
+        assert prompt_tokenizer.encode_chat("SYSTEM", parts, retry).tolist() == expected
+    assert PromptTokenizer(CharTokenizer().encode).piecewise
+
+def test_repeated_lines_and_templates_are_not_reencoded():
+    metrics.reset()
+    tokenizer = CharTokenizer()
+    prompt_tokenizer = PromptTokenizer(tokenizer.encode)
+    feedback = [f"comment number {i}" for i in range(20)]
+
+    first = prompt_tokenizer.encode_chat("SYSTEM", make_parts(feedback, "a"))
+    first_calls = tokenizer.calls
+    # Re-submission with the same items under another session id
+    second = prompt_tokenizer.encode_chat("SYSTEM", make_parts(feedback, "b"))
+
+    # Only the header and footer are encoded again
+    assert tokenizer.calls - first_calls == 2
+    assert metrics.get("token_cache_hits") == 20
+    assert len(second) == len(first)
+    # Retrying swaps the closing: one new template, no other re-encoding
+    prompt_tokenizer.encode_chat("SYSTEM", make_parts(feedback, "b"), retry=True)
+    assert tokenizer.calls - first_calls == 5
+
+def test_line_cache_is_bounded_lru():
+    prompt_tokenizer = PromptTokenizer(CharTokenizer().encode, maxsize=2)
+    for line in ("a", "b", "a", "c"):
+        prompt_tokenizer.encode_line(line)
+    metrics.reset()
+    prompt_tokenizer.encode_line("a")
+    prompt_tokenizer.encode_line("b")
+    assert metrics.get("token_cache_hits") == 1
+    assert metrics.get("token_cache_misses") == 1
+
+class TokenEngine:
+    """Accepts pre-tokenized prompts; answers with invalid JSON the first time."""
+    def __init__(self):
+        self.tokenizer = CharTokenizer()
+        self.prompt_tokenizer = PromptTokenizer(self.tokenizer.encode)
+        self.prompts = []
+
+    def encode_chat(self, system_prompt, parts, retry=False):
+        return self.prompt_tokenizer.encode_chat(system_prompt, parts, retry)
+
+    def generate(self, prompt, max_tokens=1024, cancel_token=None):
+        self.prompts.append(self.tokenizer.decode(prompt))
+        if len(self.prompts) == 1:
+            return "not json"
+        return '{"sentiment_score": 0.5, "themes": [], "strengths": [], "improvements": [], "summary": "ok"}'
+
+def test_pipeline_retry_appends_suffix_tokens():
+    analysis_cache.cache.clear()
+    metrics.reset()
+    engine = TokenEngine()
+    request = FeedbackRequest(session_id="tok1", feedback=["unique tokenization feedback"])
+    result = asyncio.run(pipeline.analyze_feedback(request, engine))
+
+    assert result.summary == "ok"
+    first, second = engine.prompts
+    assert second == first + prompt_builder.RETRY_SUFFIX
+    assert metrics.snapshot()["prompt_tokens_count"] == 2
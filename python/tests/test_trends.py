@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.core import trends
+from app.main import app
+from run_seed import SCHEMA_SQL
+
+SESSIONS = [
+    # session_id, started_at, sentiment, themes, improvements
+    ("s1", "2024-01-01 09:00:00", 0.8, ["Pacing", "Clarity"], ["More examples"]),
+    ("s2", "2024-01-03 09:00:00", 0.6, ["pacing"], ["More examples", "Slow down"]),
+    ("s3", "2024-01-09 09:00:00", 0.4, ["Clarity", "clarity"], ["None"]),
+    ("s4", "2024-01-17 09:00:00", 0.2, ["Confusion"], ["Slow down"]),
+]
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "trends.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQL)
+    trends.ensure_rollup_schema(conn)
+    conn.execute("INSERT INTO users VALUES ('t1', 'Teacher', 't@example.edu', 'teacher')")
+    conn.execute("INSERT INTO classrooms (id, name, created_by) VALUES ('room1', 'Room 1', 't1')")
+    for session_id, started_at, sentiment, themes, improvements in SESSIONS:
+        conn.execute(
+            "INSERT INTO class_sessions (id, classroom_id, started_at) VALUES (?, 'room1', ?)",
+            (session_id, started_at)
+        )
+        insights = {"sentiment_score": sentiment, "themes": themes, "improvements": improvements}
+        conn.execute(
+            "INSERT INTO feedback_summaries (id, session_id, summary_text, insights) VALUES (?, ?, 'x', ?)",
+            (f"sum_{session_id}", session_id, json.dumps(insights))
+        )
+    conn.commit()
+    conn.close()
+    return path
+
+def rollup_rows(conn):
+    # Sums accumulate in a different order incrementally than in a rebuild
+    return {
+        table: sorted(tuple(round(v, 9) if isinstance(v, float) else v for v in row)
+                      for row in conn.execute(f"SELECT * FROM {table}"))
+        for table in trends.ROLLUP_TABLES
+    }
+
+def test_triggers_maintain_rollups(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = rollup_rows(conn)
+    assert rows["classroom_week_sentiment"] == [
+        ("room1", "2024-01-01", 2, pytest.approx(1.4)),
+        ("room1", "2024-01-08", 1, pytest.approx(0.4)),
+        ("room1", "2024-01-15", 1, pytest.approx(0.2)),
+    ]
+    assert ("room1", "clarity", 2) in rows["classroom_theme_counts"]
+    assert ("room1", "pacing", 2) in rows["classroom_theme_counts"]
+    # Placeholder improvements are not counted
+    assert all(label != "none" for _, label, _ in rows["classroom_improvement_counts"])
+
+def test_updates_and_deletes_match_full_rebuild(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "UPDATE feedback_summaries SET insights = ? WHERE session_id = 's2'",
+        (json.dumps({"sentiment_score": 0.9, "themes": ["Engagement"], "improvements": []}),)
+    )
+    conn.execute("DELETE FROM feedback_summaries WHERE session_id = 's4'")
+    conn.execute("INSERT INTO feedback_summaries (id, session_id, summary_text, insights) VALUES ('bad', 's4', 'x', 'not json')")
+    conn.commit()
+    incremental = rollup_rows(conn)
+
+    trends.rebuild_rollups(conn)
+    assert incremental == rollup_rows(conn)
+    assert incremental["classroom_week_sentiment"][-1][0:3] == ("room1", "2024-01-08", 1)
+
+def test_get_trends_rolling_mean_and_rankings(db_path):
+    conn = sqlite3.connect(db_path)
+    result = trends.get_trends(conn, "room1", weeks=2, window=2, top_k=2)
+    assert result.total_sessions == 4
+    assert [w.week_start for w in result.weeks] == ["2024-01-08", "2024-01-15"]
+    assert result.weeks[0].rolling_mean_sentiment == pytest.approx((1.4 + 0.4) / 3)
+    assert result.weeks[1].mean_sentiment == pytest.approx(0.2)
+    assert [item.label for item in result.top_improvements] == ["more examples", "slow down"]
+    assert trends.get_trends(conn, "missing_room") is None
+
+def test_rolling_window_skips_empty_weeks(db_path):
+    conn = sqlite3.connect(db_path)
+    # Seven empty weeks after 2024-01-15, then one more session
+    conn.execute("INSERT INTO class_sessions (id, classroom_id, started_at) VALUES ('s5', 'room1', '2024-03-06 09:00:00')")
+    conn.execute(
+        "INSERT INTO feedback_summaries (id, session_id, summary_text, insights) VALUES ('sum_s5', 's5', 'x', ?)",
+        (json.dumps({"sentiment_score": 1.0}),)
+    )
+    conn.commit()
+    result = trends.get_trends(conn, "room1", weeks=2, window=4)
+    assert [w.week_start for w in result.weeks] == ["2024-01-15", "2024-03-04"]
+    # 2024-01-15 still reaches back three weeks; 2024-03-04 has nothing within four
+    assert result.weeks[0].rolling_mean_sentiment == pytest.approx((1.4 + 0.4 + 0.2) / 4)
+    assert result.weeks[1].rolling_mean_sentiment == pytest.approx(1.0)
+
+def test_trends_endpoint(db_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_path", str(db_path))
+    with TestClient(app) as client:
+        response = client.get("/api/v1/trends/room1", params={"weeks": 4, "top_k": 3})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_sessions"] == 4
+        assert len(data["weeks"]) == 3
+        assert data["top_themes"][0]["count"] == 2
+
+        assert client.get("/api/v1/trends/nope").status_code == 404
+        assert client.get("/api/v1/trends/room1", params={"weeks": 0}).status_code == 422